@@ -0,0 +1,158 @@
+"""Pick the fastest solve_ivp setup that still meets an accuracy budget.
+
+A tight reference solution is computed once, then the solver method,
+tolerances, Jacobian mode and first step are searched for the fastest
+configuration whose observables stay within the requested relative error.
+The chosen configuration is stored as JSON so sweeps can reuse it.
+"""
+
+import json
+import time
+
+import numpy as np
+from scipy import sparse
+from scipy.integrate import solve_ivp
+
+methods = ["BDF", "Radau", "LSODA"]
+jac_modes = ["analytic", "sparse", "fd"]
+tolerances = [1.e-4, 1.e-5, 1.e-6, 1.e-7, 1.e-8, 1.e-9, 1.e-10, 1.e-11, 1.e-12]
+
+
+def _jacobian(net, mode):
+    """Return the solve_ivp ``jac`` argument for a Jacobian mode."""
+    if mode == "fd":
+        return None
+    if mode == "sparse":
+        # table-driven networks fill the CSC matrix directly
+        if hasattr(net, "jacobian_sparse"):
+            return net.jacobian_sparse
+        return lambda t, Y, *args: sparse.csc_matrix(net.jacobian(t, Y, *args))
+    return net.jacobian
+
+
+def solver_kwargs(net, config, rho, T, screen_func=None):
+    """Turn a stored configuration into keyword arguments for solve_ivp."""
+    kwargs = {"method": config["method"],
+              "rtol": config["rtol"],
+              "atol": config["atol"],
+              "args": (rho, T, screen_func),
+              "jac": _jacobian(net, config["jac"])}
+    if config.get("first_step") is not None:
+        kwargs["first_step"] = config["first_step"]
+    # finite differences only need to probe the nonzero columns
+    if config["jac"] == "fd" and config["method"] != "LSODA" and hasattr(net, "jacobian_sparsity"):
+        kwargs["jac_sparsity"] = net.jacobian_sparsity()
+    return kwargs
+
+
+def observe(net, sol, observables):
+    """Evaluate the observables of a solution.
+
+    ``observables`` is either a list of species names, giving their mass
+    fractions at every output time, or a callable ``f(sol)`` returning an array.
+    """
+    if callable(observables):
+        return np.asarray(observables(sol), dtype=np.float64)
+    idx = [net.names.index(name) for name in observables]
+    return sol.y[idx] * net.A[idx, None]
+
+
+def relative_error(values, reference, floor=1.e-30):
+    """Largest relative deviation from the reference, ignoring values below floor."""
+    mask = np.abs(reference) > floor
+    if not np.any(mask):
+        return 0.0
+    return np.max(np.abs(values[mask] - reference[mask]) / np.abs(reference[mask]))
+
+
+def _run(net, config, y0, t_span, t_eval, rho, T, screen_func):
+    kwargs = solver_kwargs(net, config, rho, T, screen_func)
+    start = time.perf_counter()
+    sol = solve_ivp(net.rhs, t_span, y0, t_eval=t_eval, **kwargs)
+    return sol, time.perf_counter() - start
+
+
+def autotune(net, y0, t_span, rho, T, observables, budget, screen_func=None,
+             t_eval=None, first_steps=(None,), ymin=1.e-20, floor=1.e-30,
+             filename=None):
+    """Search for the fastest configuration within a relative error ``budget``.
+
+    The reference uses BDF with the analytic Jacobian at rtol = 1e-13, as in
+    the notebooks, and atol = 1e-13 * ymin so that it is tighter than every
+    candidate.  For each method, Jacobian mode and
+    first step the loosest tolerance meeting the budget is located by bisection
+    over ``tolerances`` and timed, with ``atol = ymin * rtol`` where ``ymin``
+    is the smallest molar fraction that matters.  Returns the best
+    configuration, with the measured ``time`` and ``error``, and writes it to
+    ``filename`` if given.
+    """
+    y0 = np.asarray(y0, dtype=np.float64)
+    if t_eval is None:
+        t_eval = np.array([t_span[-1]])
+
+    reference = {"method": "BDF", "rtol": 1.e-13, "atol": 1.e-13 * ymin,
+                 "jac": "analytic", "first_step": None}
+    sol, _ = _run(net, reference, y0, t_span, t_eval, rho, T, screen_func)
+    if not sol.success:
+        raise RuntimeError(f"reference solution failed: {sol.message}")
+    target = observe(net, sol, observables)
+
+    def trial(config):
+        try:
+            sol, elapsed = _run(net, config, y0, t_span, t_eval, rho, T, screen_func)
+        except Exception:
+            return None
+        if not sol.success or sol.y.shape[1] != len(t_eval):
+            return None
+        error = relative_error(observe(net, sol, observables), target, floor)
+        return error, elapsed
+
+    best = None
+    for method in methods:
+        for jac in jac_modes:
+            # LSODA only accepts dense Jacobians
+            if method == "LSODA" and jac == "sparse":
+                continue
+            for first_step in first_steps:
+
+                # loosest passing tolerance, assuming the error shrinks with rtol
+                lo, hi = 0, len(tolerances) - 1
+                found = None
+                while lo <= hi:
+                    mid = (lo + hi) // 2
+                    config = {"method": method, "rtol": tolerances[mid],
+                              "atol": tolerances[mid] * ymin,
+                              "jac": jac, "first_step": first_step}
+                    result = trial(config)
+                    if result is not None and result[0] <= budget:
+                        found = (config, result)
+                        hi = mid - 1
+                    else:
+                        lo = mid + 1
+
+                if found is None:
+                    continue
+
+                config, (error, elapsed) = found
+                if best is None or elapsed < best["time"]:
+                    best = dict(config, time=elapsed, error=error)
+
+    if best is None:
+        raise RuntimeError("no configuration met the error budget")
+
+    if filename is not None:
+        save_config(best, filename)
+
+    return best
+
+
+def save_config(config, filename):
+    """Write a solver configuration to a JSON file."""
+    with open(filename, "w") as f:
+        json.dump(config, f, indent=2)
+
+
+def load_config(filename):
+    """Read a solver configuration written by ``save_config``."""
+    with open(filename) as f:
+        return json.load(f)
@@ -0,0 +1,210 @@
+"""Checkpoint and restart for long network integrations.
+
+``integrate`` steps a scipy ODE solver by hand (same arguments as
+``solve_ivp``) and periodically writes the solver state to disk.  For BDF
+the step size, order and the difference array holding the history are
+kept, so a restarted run continues from the same state and step size.  The
+Jacobian, its LU factorization and the Newton state are not saved but
+recomputed, so the steps after a restart may differ from those of an
+uninterrupted run and the results agree with it to within the tolerances.
+For the other methods only ``t``, ``y`` and the last step size are kept.
+
+Each job of a sweep gets its own checkpoint file, named after the job (see
+``job_name``), so a preempted batch job skips the finished points and
+resumes the others.
+"""
+
+import os
+import time
+
+import numpy as np
+from scipy.integrate import BDF, DOP853, LSODA, RK23, RK45, Radau
+from scipy.optimize import OptimizeResult
+
+METHODS = {"BDF": BDF, "Radau": Radau, "LSODA": LSODA,
+           "RK23": RK23, "RK45": RK45, "DOP853": DOP853}
+
+# BDF attributes needed to continue with the same order and history
+bdf_state = ["h_abs", "h_abs_old", "error_norm_old", "order", "n_equal_steps", "D"]
+
+
+class Checkpoint:
+    """Checkpoint file of one job, written every ``interval`` seconds of
+    wall time and/or every ``every`` solver steps."""
+
+    def __init__(self, directory, job="network", interval=600., every=None):
+        self.directory = directory
+        self.job = job
+        self.interval = interval
+        self.every = every
+        self.last = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, f"{self.job}.npz")
+
+    def due(self, nsteps):
+        """True if a checkpoint should be written after ``nsteps`` steps."""
+        if self.every is not None and nsteps % self.every == 0:
+            return True
+        return self.interval is not None and time.monotonic() - self.last >= self.interval
+
+    def save(self, state):
+        """Write a dict of arrays, replacing the previous checkpoint atomically."""
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, **state)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self.last = time.monotonic()
+
+    def load(self):
+        """Return the latest checkpoint as a dict, or None if there is none."""
+        if not os.path.exists(self.path):
+            return None
+        with np.load(self.path) as f:
+            return {key: f[key] for key in f.files}
+
+    def completed(self):
+        """True if the job has already run to the end."""
+        state = self.load()
+        return state is not None and bool(state["done"])
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def job_name(**conditions):
+    """Stable job name for a sweep point, e.g. job_name(rho=150, T=1.5e7)."""
+    return "_".join(f"{key}{value:.6e}" for key, value in sorted(conditions.items()))
+
+
+def _bind(func, args):
+    # same wrapping solve_ivp does for ``args``
+    if args is None or not callable(func):
+        return func
+    return lambda t, y: func(t, y, *args)
+
+
+def _restore(solver, state):
+    """Put a saved BDF state back into a freshly created solver.
+
+    The Jacobian is kept from the solver's creation at the restart point and
+    refactorized on the first step.
+    """
+    for name in bdf_state:
+        value = state[name]
+        if value.ndim == 0:
+            value = value.item()
+            # NaN stands for the None of a solver that has not stepped yet
+            if isinstance(value, float) and np.isnan(value):
+                value = None
+        setattr(solver, name, value)
+    solver.LU = None
+
+
+def _result(ts, ys, n, status, message, counts, restarted):
+    return OptimizeResult(t=np.array(ts), y=np.array(ys).reshape(-1, n).T,
+                          status=status, message=message, success=status == 0,
+                          nfev=counts[0], njev=counts[1], nlu=counts[2],
+                          restarted=restarted)
+
+
+def integrate(fun, t_span, y0, method="BDF", t_eval=None, args=None,
+              checkpoint=None, **options):
+    """Integrate like ``solve_ivp``, resuming from ``checkpoint`` if it exists.
+
+    ``checkpoint`` is a ``Checkpoint``; without one this is a plain
+    integration.  ``options`` (rtol, atol, jac, first_step, ...) go to the
+    solver.  Returns an OptimizeResult with ``t``, ``y``, ``status``,
+    ``message``, ``success``, ``nfev``, ``njev``, ``nlu`` and ``restarted``.
+    A job already marked as done returns its stored result right away.
+    """
+    t0, tf = map(float, t_span)
+    y0 = np.asarray(y0, dtype=np.float64)
+    if t_eval is not None:
+        t_eval = np.asarray(t_eval, dtype=np.float64)
+
+    fun = _bind(fun, args)
+    if "jac" in options:
+        options["jac"] = _bind(options["jac"], args)
+
+    state = checkpoint.load() if checkpoint is not None else None
+    if state is not None and (str(state["method"]) != method or float(state["t_bound"]) != tf):
+        raise ValueError(f"{checkpoint.path} was written for a different integration")
+
+    if state is not None:
+        ts, ys = list(state["ts"]), list(state["ys"])
+        counts = state["counts"].copy()
+        if bool(state["done"]):
+            return _result(ts, ys, len(y0), 0, "Loaded from checkpoint.", counts, True)
+        t, y = float(state["t"]), state["y"]
+        # one-step methods carry on with the last step; LSODA restarts at
+        # order 1 and picks its own
+        if method not in ("BDF", "LSODA"):
+            options["first_step"] = float(state["step"])
+        solver = METHODS[method](fun, t, y, tf, **options)
+        if method == "BDF":
+            _restore(solver, state)
+    else:
+        ts, ys = ([], []) if t_eval is not None else ([t0], [y0])
+        counts = np.zeros(3, dtype=np.int64)
+        solver = METHODS[method](fun, t0, y0, tf, **options)
+
+    restarted = state is not None
+    nsteps = 0
+
+    def snapshot(done):
+        # counts of this run are added to those of the runs before it
+        total = counts + [solver.nfev, solver.njev, solver.nlu]
+        current = {"t": solver.t, "y": solver.y, "t_bound": tf, "method": method,
+                   "step": solver.step_size if solver.step_size is not None else np.nan,
+                   "ts": np.array(ts), "ys": np.array(ys).reshape(-1, len(y0)),
+                   "counts": total, "done": done}
+        if method == "BDF":
+            for name in bdf_state:
+                value = getattr(solver, name)
+                current[name] = np.nan if value is None else value
+        return current, total
+
+    status = None
+    while status is None:
+        message = solver.step()
+        nsteps += 1
+
+        if solver.status == "failed":
+            status = -1
+            break
+        if solver.status == "finished":
+            status = 0
+
+        if t_eval is None:
+            ts.append(solver.t)
+            ys.append(solver.y.copy())
+        else:
+            # output points passed in this step
+            t_old = solver.t_old
+            inside = (t_eval > t_old) & (t_eval <= solver.t) if tf > t0 else \
+                     (t_eval < t_old) & (t_eval >= solver.t)
+            if t_old == t0:
+                inside |= t_eval == t0
+            if np.any(inside):
+                sol = solver.dense_output()
+                for te in t_eval[inside]:
+                    ts.append(te)
+                    ys.append(sol(te))
+
+        if checkpoint is not None and status is None and checkpoint.due(nsteps):
+            checkpoint.save(snapshot(False)[0])
+
+    current, total = snapshot(status == 0)
+    if checkpoint is not None and status == 0:
+        checkpoint.save(current)
+
+    if status == 0:
+        message = "The solver successfully reached the end of the integration interval."
+
+    return _result(ts, ys, len(y0), status, message, total, restarted)
@@ -0,0 +1,134 @@
+"""Stiffness and timescale diagnostics for the generated reaction networks.
+
+The functions here take a network module (e.g. ``cno_network_module``) and a
+``solve_ivp`` solution, sample the trajectory, and look at the spectrum of
+``jacobian_eq`` along it to suggest a solver and tolerances.
+"""
+
+import numpy as np
+
+# BDF of order 5 is only A(alpha)-stable with alpha ~ 51 deg, so eigenvalues
+# further from the negative real axis than this call for an A-stable method
+bdf_max_angle = np.deg2rad(51.)
+
+
+def _condition(value, t):
+    """Evaluate a scalar, array or callable condition at the sample times."""
+    if callable(value):
+        return np.array([value(ti) for ti in t], dtype=np.float64)
+    return np.broadcast_to(np.asarray(value, dtype=np.float64), t.shape)
+
+
+def sample_trajectory(sol, nsamples=50):
+    """Return log-spaced snapshot times and abundances from a solve_ivp solution."""
+    t = sol.t
+    tpos = t[t > 0]
+    times = np.geomspace(tpos[0], t[-1], nsamples - 1) if len(tpos) else np.array([])
+    times = np.unique(np.concatenate(([t[0]], times)))
+
+    if sol.sol is not None:
+        Y = sol.sol(times).T
+    else:
+        Y = np.array([np.interp(times, t, y) for y in sol.y]).T
+
+    # keep the rows contiguous so the compiled kernels are not respecialized
+    return times, np.ascontiguousarray(np.clip(Y, 0.0, None))
+
+
+def jacobian_snapshots(net, t, Y, rho, T, screen_func=None):
+    """Stack the network Jacobian at each snapshot into an (n, nnuc, nnuc) array."""
+    rho = _condition(rho, t)
+    T = _condition(T, t)
+
+    jacs = np.empty((len(t), net.nnuc, net.nnuc))
+    for i in range(len(t)):
+        jacs[i] = net.jacobian(t[i], Y[i], rho[i], T[i], screen_func)
+    return jacs
+
+
+def destruction_timescales(jacs):
+    """Per-species destruction timescales 1/lambda_i from the Jacobian diagonal."""
+    lam = -np.diagonal(jacs, axis1=-2, axis2=-1)
+    tau = np.full(lam.shape, np.inf)
+    np.divide(1.0, lam, out=tau, where=lam > 0)
+    return tau
+
+
+def stiffness_ratio(eigenvalues, rel_floor=1.e-12):
+    """Ratio of the fastest to the slowest decaying mode at each snapshot.
+
+    Eigenvalues smaller than ``rel_floor`` times the largest one are treated as
+    the zero modes coming from conservation laws and are ignored.
+    """
+    re = np.abs(eigenvalues.real)
+    fastest = re.max(axis=-1)
+    active = re > rel_floor * fastest[..., None]
+    slowest = np.where(active, re, np.inf).min(axis=-1)
+
+    ratio = np.ones_like(fastest)
+    np.divide(fastest, slowest, out=ratio, where=np.isfinite(slowest) & (fastest > 0))
+    return ratio
+
+
+def diagnose(net, sol, rho, T, screen_func=None, nsamples=50):
+    """Sample a trajectory and compute its spectrum and timescales.
+
+    ``rho`` and ``T`` may be scalars or callables of time.  Returns a dict
+    with the snapshot times ``t``, abundances ``Y``, Jacobian ``eigenvalues``,
+    per-species ``timescales`` and the ``stiffness`` ratio at every snapshot.
+    """
+    t, Y = sample_trajectory(sol, nsamples)
+    jacs = jacobian_snapshots(net, t, Y, rho, T, screen_func)
+
+    # batched LAPACK call over all the snapshots
+    eigenvalues = np.linalg.eigvals(jacs)
+
+    return {"t": t,
+            "Y": Y,
+            "eigenvalues": eigenvalues,
+            "timescales": destruction_timescales(jacs),
+            "stiffness": stiffness_ratio(eigenvalues)}
+
+
+def recommend_solver(diag, precision=1.e-6, ymin=None):
+    """Suggest solve_ivp keyword arguments from a ``diagnose`` result.
+
+    ``precision`` is the relative accuracy needed on the abundances and
+    ``ymin`` the smallest molar fraction that still matters; by default it is
+    the smallest peak abundance among the species that ever exceed 1e-12 of
+    the most abundant one along the sampled trajectory.
+    """
+    stiffness = diag["stiffness"].max()
+
+    eigenvalues = diag["eigenvalues"]
+    re = np.abs(eigenvalues.real)
+    significant = re > 1.e-12 * re.max(axis=-1, keepdims=True)
+    angle = np.arctan2(np.abs(eigenvalues.imag), re)
+    max_angle = np.where(significant, angle, 0.0).max()
+
+    if stiffness < 10.:
+        method = "DOP853" if precision < 1.e-8 else "RK45"
+    elif stiffness < 1.e3:
+        method = "LSODA"
+    elif max_angle > bdf_max_angle:
+        method = "Radau"
+    else:
+        method = "BDF"
+
+    if ymin is None:
+        peak = diag["Y"].max(axis=0)
+        relevant = peak > 1.e-12 * peak.max()
+        ymin = peak[relevant].min() if np.any(relevant) else 1.e-30
+
+    # keep a safety factor of 10 below the precision asked for
+    rtol = max(0.1 * precision, 1.e-13)
+    atol = max(rtol * ymin, 1.e-30)
+
+    # start with a step well inside the fastest timescale at t0
+    tau0 = diag["timescales"][0]
+    first_step = 0.1 * tau0[np.isfinite(tau0)].min() if np.any(np.isfinite(tau0)) else None
+
+    return {"method": method,
+            "rtol": rtol,
+            "atol": atol,
+            "first_step": first_step}
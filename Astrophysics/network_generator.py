@@ -0,0 +1,68 @@
+"""Generate coefficient tables for ``ReaclibNetwork`` from pynucastro.
+
+Rather than writing a Python module with one function per rate and unrolled
+rhs/Jacobian expressions (``PythonNetwork.write_network``), only the nuclei,
+the stoichiometry and the REACLIB sets are written out.  The compiled
+kernels in ``reaclib_network`` loop over those arrays, so compile time does
+not grow with the network and the runtime scales with the number of rates.
+"""
+
+import pynucastro as pyna
+from pynucastro.constants import constants
+
+from reaclib_network import ReaclibNetwork
+
+
+def nucleus_name(nuc):
+    """Name used by the generated pynucastro modules (H1, He4, ..., n)."""
+    name = nuc.short_spec_name
+    if name != "n":
+        name = name.capitalize()
+    return name
+
+
+def write_network_table(rate_collection, filename):
+    """Write the nuclei, reactions and REACLIB sets of a RateCollection."""
+    nuclei = rate_collection.unique_nuclei
+    order = {nuc: (nuc.Z, nuc.A) for nuc in nuclei}
+
+    with open(filename, "w") as f:
+        f.write("# REACLIB rate sets written by network_generator.py\n")
+        f.write("#\n# nucleus   name  A   Z   mass [erg]\n")
+        for nuc in nuclei:
+            mass = nuc.A_nuc * constants.m_u_MeV * constants.MeV2erg
+            f.write(f"nucleus  {nucleus_name(nuc):5s} {nuc.A:3d} {nuc.Z:3d}  {mass!r}\n")
+
+        rates = rate_collection.get_rates()
+        for rate in rates:
+            if not isinstance(rate, pyna.rates.ReacLibRate):
+                raise ValueError(f"{rate.fname}: only REACLIB rates can be written to a table, "
+                                 "add tabulated rates with ReaclibNetwork.add_table_rate")
+
+        f.write("#\n# reaction  name  reactants  products  [ec]\n")
+        for rate in rates:
+            reactants = ",".join(nucleus_name(n) for n in sorted(rate.reactants, key=order.get))
+            products = ",".join(nucleus_name(n) for n in sorted(rate.products, key=order.get))
+            flag = "  ec" if rate.weak_type == "electron_capture" else ""
+            f.write(f"reaction  {rate.fname:24s} {reactants:10s} {products}{flag}\n")
+
+        f.write("#\n# set  reaction  label  a0  a1  a2  a3  a4  a5  a6\n")
+        for rate in rates:
+            for s in rate.sets:
+                label = s.labelprops.replace(" ", "") or "none"
+                f.write(f"set  {rate.fname:24s} {label:6s} " + " ".join(repr(float(a)) for a in s.a) + "\n")
+
+
+def generate(nuclei, filename, library=None):
+    """Link ``nuclei`` in a REACLIB library, write the table and load it.
+
+    ``nuclei`` are pynucastro names (e.g. ``["p", "he4", "f19", "ne20"]``);
+    by default the full ReacLib library shipped with pynucastro is used.
+    """
+    if library is None:
+        library = pyna.ReacLibLibrary()
+
+    rate_collection = pyna.RateCollection(libraries=library.linking_nuclei(nuclei))
+    write_network_table(rate_collection, filename)
+
+    return ReaclibNetwork.load(filename)
@@ -0,0 +1,737 @@
+"""Reaction network driven by a REACLIB coefficient table loaded at runtime.
+
+Instead of one generated function per rate, the network reads its nuclei,
+reactions and 7-parameter REACLIB sets from a data file (see
+``data/cno_reaclib.dat``) and evaluates them in compiled loops over arrays.
+Rate sets can be replaced, added or rescaled from Python and the next call
+picks them up without any code generation or recompilation.
+
+With ``heating_rhs``/``heating_jacobian`` the temperature is evolved together
+with the abundances, dT/dt = eps_nuc / c_v, using analytic temperature
+derivatives of the rates.
+"""
+
+import math
+import os
+from collections import namedtuple
+
+import numba
+import numpy as np
+from numba.typed import List
+from scipy import constants, sparse
+
+from pynucastro.screening import PlasmaState, ScreenFactors
+
+NetworkData = namedtuple("NetworkData", ["coeffs", "set_rate", "nreact", "react",
+                                         "nprod", "prod", "prefactor", "dens_pow",
+                                         "ec", "A", "Z", "pairs", "screen_factors",
+                                         "rate_pair",
+                                         "tab_rate", "tab_lnT0", "tab_idlnT",
+                                         "tab_lnrate", "tab_cache",
+                                         "jac_pos", "jac_nnz", "mass"])
+
+# scratch arrays reused between calls: the rates, their temperature
+# derivatives, the screening factor of every pair and dln(scor)/dT
+Workspace = namedtuple("Workspace", ["rates", "drates", "scor", "dscor"])
+
+avogadro = constants.Avogadro
+
+# relative temperature step of the central difference of the screening
+# derivative when the screening function has no analytic one: the error is
+# ~ screen_dlnT^2 from truncation plus ~ 1e-16 / screen_dlnT from rounding
+screen_dlnT = 1.e-4
+
+
+@numba.njit()
+def make_workspace(data):
+    """Allocate the scratch arrays used by the ``*_into`` kernels."""
+    nrates = data.nreact.shape[0]
+    return Workspace(np.zeros(nrates, dtype=np.float64),
+                     np.zeros(nrates, dtype=np.float64),
+                     np.ones(data.pairs.shape[0], dtype=np.float64),
+                     np.zeros(data.pairs.shape[0], dtype=np.float64))
+
+
+@numba.njit()
+def reaclib_rates(coeffs, set_rate, T, rates, drates):
+    """Sum the REACLIB sets of every rate at temperature T into ``rates``,
+    and their analytic dlambda/dT into ``drates``."""
+    T9 = T / 1.e9
+    T9i = 1.0 / T9
+    T913 = T9**(1./3.)
+    T913i = 1.0 / T913
+    T923 = T913 * T913
+    T953 = T9 * T923
+    lnT9 = np.log(T9)
+
+    rates[:] = 0.0
+    drates[:] = 0.0
+    for k in range(coeffs.shape[0]):
+        rate = np.exp(coeffs[k, 0] + coeffs[k, 1]*T9i + coeffs[k, 2]*T913i
+                      + coeffs[k, 3]*T913 + coeffs[k, 4]*T9
+                      + coeffs[k, 5]*T953 + coeffs[k, 6]*lnT9)
+        rates[set_rate[k]] += rate
+
+        # dln(lambda)/dT9 of the set
+        dlndT9 = (-coeffs[k, 1]*T9i*T9i - coeffs[k, 2]*T913i*T9i/3.
+                  + coeffs[k, 3]*T913i*T913i/3. + coeffs[k, 4]
+                  + 5./3.*coeffs[k, 5]*T923 + coeffs[k, 6]*T9i)
+        drates[set_rate[k]] += rate * dlndT9 / 1.e9
+
+
+@numba.njit()
+def tabular_rates(tab_rate, tab_lnT0, tab_idlnT, tab_lnrate, tab_cache, T, rates, drates):
+    """Add the tabulated rates at temperature T to ``rates``.
+
+    Each table holds ln(rate) on a uniform ln(T9) grid, so the bracket is
+    found in O(1) and the interpolant is linear in log space.  The bracket
+    and weight of the last temperature are kept in ``tab_cache`` and reused
+    while T does not change.  ``drates`` receives the analytic dlambda/dT,
+    0 outside the table where the rate is held at its edge value.
+    """
+    lnT9 = np.log(T / 1.e9)
+
+    for k in range(tab_rate.shape[0]):
+        if tab_cache[k, 0] != lnT9:
+            n = tab_lnrate.shape[1]
+            x = (lnT9 - tab_lnT0[k]) * tab_idlnT[k]
+            # clamp to the ends of the table, where the rate is constant
+            inside = 1.0
+            if x <= 0.0:
+                i, f, inside = 0, 0.0, 0.0
+            elif x >= n - 1:
+                i, f, inside = n - 2, 1.0, 0.0
+            else:
+                i = int(x)
+                f = x - i
+            tab_cache[k, 0] = lnT9
+            tab_cache[k, 1] = i
+            tab_cache[k, 2] = f
+            tab_cache[k, 3] = inside
+
+        i = int(tab_cache[k, 1])
+        f = tab_cache[k, 2]
+        lo = tab_lnrate[k, i]
+        hi = tab_lnrate[k, i + 1]
+
+        rate = np.exp(lo + f * (hi - lo))
+        rates[tab_rate[k]] += rate
+
+        # dlambda/dT = lambda * dln(lambda)/dln(T) / T, zero off the table
+        drates[tab_rate[k]] += tab_cache[k, 3] * rate * (hi - lo) * tab_idlnT[k] / T
+
+
+@numba.njit()
+def evaluate_rates_into(Y, rho, T, screen_func, data, work):
+    """Write the screened rates of every reaction into ``work.rates``."""
+    rates = work.rates
+    reaclib_rates(data.coeffs, data.set_rate, T, rates, work.drates)
+
+    tabular_rates(data.tab_rate, data.tab_lnT0, data.tab_idlnT, data.tab_lnrate,
+                  data.tab_cache, T, rates, work.drates)
+
+    if screen_func is not None:
+        plasma_state = PlasmaState(T, rho, Y, data.Z)
+
+        for p in range(data.pairs.shape[0]):
+            work.scor[p] = screen_func(plasma_state, data.screen_factors[p])
+
+        # three-body rates (3-alpha) carry a second pair
+        for r in range(rates.shape[0]):
+            for q in range(data.rate_pair.shape[1]):
+                if data.rate_pair[r, q] >= 0:
+                    rates[r] *= work.scor[data.rate_pair[r, q]]
+
+
+@numba.njit()
+def screen_weak(plasma_state, scn_fac):
+    """Weak (Salpeter) screening, exp(z1 z2 e^2 / (k T lambda_D))."""
+    return np.exp(scn_fac.z1 * scn_fac.z2 * plasma_state.qlam0z)
+
+
+@numba.njit()
+def dlnscreen_weak(plasma_state, scn_fac):
+    """Analytic dln(scor)/dT of ``screen_weak``; qlam0z goes as T^(-3/2)."""
+    return -1.5 * scn_fac.z1 * scn_fac.z2 * plasma_state.qlam0z / plasma_state.temp
+
+
+# screening functions with an analytic temperature derivative; the others,
+# including all of pynucastro.screening, are differenced numerically
+screen_derivatives = {screen_weak: dlnscreen_weak}
+
+
+@numba.njit()
+def temperature_derivatives(Y, rho, T, screen_func, dscreen_func, data, work):
+    """Turn ``work.drates`` into the derivative of the screened rates.
+
+    Must follow ``evaluate_rates_into`` at the same state.  dln(scor)/dT comes
+    from ``dscreen_func`` when given, otherwise from a central difference of
+    ln(scor) over T (1 +- ``screen_dlnT``) (two extra calls of
+    ``screen_func`` per pair).
+    """
+    if screen_func is None:
+        return
+
+    if dscreen_func is not None:
+        plasma_state = PlasmaState(T, rho, Y, data.Z)
+    else:
+        dT = screen_dlnT * T
+        upper_state = PlasmaState(T + dT, rho, Y, data.Z)
+        lower_state = PlasmaState(T - dT, rho, Y, data.Z)
+
+    for p in range(data.pairs.shape[0]):
+        scn_fac = data.screen_factors[p]
+        if dscreen_func is not None:
+            work.dscor[p] = dscreen_func(plasma_state, scn_fac)
+        else:
+            work.dscor[p] = (np.log(screen_func(upper_state, scn_fac))
+                             - np.log(screen_func(lower_state, scn_fac))) / (2 * dT)
+
+    # d(scor lambda)/dT = scor dlambda/dT + scor lambda dln(scor)/dT
+    for r in range(work.rates.shape[0]):
+        scor = 1.0
+        dlnscor = 0.0
+        for q in range(data.rate_pair.shape[1]):
+            p = data.rate_pair[r, q]
+            if p >= 0:
+                scor *= work.scor[p]
+                dlnscor += work.dscor[p]
+        work.drates[r] = work.drates[r] * scor + work.rates[r] * dlnscor
+
+
+@numba.njit()
+def evaluate_rates(Y, rho, T, screen_func, data):
+    """Return the screened rates of every reaction."""
+    work = make_workspace(data)
+    evaluate_rates_into(Y, rho, T, screen_func, data, work)
+    return work.rates
+
+
+@numba.njit()
+def rate_factors(Y, rho, rates, data):
+    """Multiply in the prefactor, density and electron fraction of each rate.
+
+    Also used on the temperature derivatives, which scale the same way.
+    """
+    zy = 0.0
+    ay = 0.0
+    for i in range(Y.shape[0]):
+        zy += data.Z[i] * Y[i]
+        ay += data.A[i] * Y[i]
+    ye = zy / ay
+
+    for r in range(rates.shape[0]):
+        rates[r] *= data.prefactor[r] * rho**data.dens_pow[r]
+        if data.ec[r]:
+            rates[r] *= ye
+
+
+@numba.njit()
+def rhs_into(out, t, Y, rho, T, screen_func, data, work):
+    """Write dY/dt into ``out`` without allocating."""
+    evaluate_rates_into(Y, rho, T, screen_func, data, work)
+    rates = work.rates
+    rate_factors(Y, rho, rates, data)
+
+    out[:] = 0.0
+
+    for r in range(rates.shape[0]):
+        flux = rates[r]
+        for m in range(data.nreact[r]):
+            flux *= Y[data.react[r, m]]
+
+        for m in range(data.nreact[r]):
+            out[data.react[r, m]] -= flux
+        for m in range(data.nprod[r]):
+            out[data.prod[r, m]] += flux
+
+
+@numba.njit()
+def jacobian_into(out, t, Y, rho, T, screen_func, data, work):
+    """Write the dense Jacobian into ``out`` without allocating."""
+    evaluate_rates_into(Y, rho, T, screen_func, data, work)
+    rate_factors(Y, rho, work.rates, data)
+    jacobian_fill(out, Y, work.rates, data)
+
+
+@numba.njit()
+def jacobian_fill(out, Y, rates, data):
+    """Fill the dense Jacobian from the fully scaled rates."""
+    out[:, :] = 0.0
+
+    for r in range(rates.shape[0]):
+        # derivative with respect to each reactant slot, repeated nuclei
+        # pick up one term per slot
+        for m in range(data.nreact[r]):
+            j = data.react[r, m]
+            dflux = rates[r]
+            for n in range(data.nreact[r]):
+                if n != m:
+                    dflux *= Y[data.react[r, n]]
+
+            for n in range(data.nreact[r]):
+                out[data.react[r, n], j] -= dflux
+            for n in range(data.nprod[r]):
+                out[data.prod[r, n], j] += dflux
+
+
+@numba.njit()
+def jacobian_sparse_into(out, t, Y, rho, T, screen_func, data, work):
+    """Write the Jacobian values in CSC order into ``out``.
+
+    ``data.jac_pos[r, m, n]`` is the position of the term of reaction r,
+    reactant slot m, acting on reactant (then product) slot n.
+    """
+    evaluate_rates_into(Y, rho, T, screen_func, data, work)
+    rates = work.rates
+    rate_factors(Y, rho, rates, data)
+
+    out[:] = 0.0
+
+    for r in range(rates.shape[0]):
+        nreact = data.nreact[r]
+        for m in range(nreact):
+            dflux = rates[r]
+            for n in range(nreact):
+                if n != m:
+                    dflux *= Y[data.react[r, n]]
+
+            for n in range(nreact):
+                out[data.jac_pos[r, m, n]] -= dflux
+            for n in range(data.nprod[r]):
+                out[data.jac_pos[r, m, nreact + n]] += dflux
+
+
+@numba.njit()
+def heating_rhs_into(out, t, y, rho, cv, screen_func, data, work):
+    """dY/dt and dT/dt = eps_nuc / cv for the state y = (Y, T)."""
+    n = y.shape[0] - 1
+    Y = y[:n]
+    T = y[n]
+    rhs_into(out[:n], t, Y, rho, T, screen_func, data, work)
+
+    enuc = 0.0
+    for i in range(n):
+        enuc -= out[i] * data.mass[i]
+    out[n] = enuc * avogadro / cv
+
+
+@numba.njit()
+def heating_jacobian_into(out, t, y, rho, cv, screen_func, dscreen_func, data, work):
+    """Jacobian of ``heating_rhs_into``, with the T row and column."""
+    n = y.shape[0] - 1
+    Y = y[:n]
+    T = y[n]
+    evaluate_rates_into(Y, rho, T, screen_func, data, work)
+    temperature_derivatives(Y, rho, T, screen_func, dscreen_func, data, work)
+    rate_factors(Y, rho, work.rates, data)
+    rate_factors(Y, rho, work.drates, data)
+    jacobian_fill(out[:n, :n], Y, work.rates, data)
+
+    out[:, n] = 0.0
+    for r in range(work.drates.shape[0]):
+        dflux = work.drates[r]
+        for m in range(data.nreact[r]):
+            dflux *= Y[data.react[r, m]]
+
+        for m in range(data.nreact[r]):
+            out[data.react[r, m], n] -= dflux
+        for m in range(data.nprod[r]):
+            out[data.prod[r, m], n] += dflux
+
+    # the T row is -N_A / cv times the mass-weighted sum of the others
+    for j in range(n + 1):
+        denuc = 0.0
+        for i in range(n):
+            denuc -= out[i, j] * data.mass[i]
+        out[n, j] = denuc * avogadro / cv
+
+
+@numba.njit()
+def rhs_eq(t, Y, rho, T, screen_func, data):
+    dYdt = np.empty(Y.shape[0], dtype=np.float64)
+    rhs_into(dYdt, t, Y, rho, T, screen_func, data, make_workspace(data))
+    return dYdt
+
+
+@numba.njit()
+def jacobian_eq(t, Y, rho, T, screen_func, data):
+    jac = np.empty((Y.shape[0], Y.shape[0]), dtype=np.float64)
+    jacobian_into(jac, t, Y, rho, T, screen_func, data, make_workspace(data))
+    return jac
+
+
+@numba.njit()
+def jacobian_sparse_eq(t, Y, rho, T, screen_func, data):
+    values = np.empty(data.jac_nnz, dtype=np.float64)
+    jacobian_sparse_into(values, t, Y, rho, T, screen_func, data, make_workspace(data))
+    return values
+
+
+class ReaclibNetwork:
+    """A REACLIB network read from a coefficient table.
+
+    The object exposes the same interface as the pynucastro generated
+    modules (``nnuc``, ``names``, ``A``, ``Z``, ``mass``, ``rhs``,
+    ``jacobian``), so it can be used wherever ``cno_network_module`` is.
+    """
+
+    def __init__(self, names, A, Z, mass, reactions, sets):
+        self.names = list(names)
+        self.nnuc = len(self.names)
+        self.A = np.asarray(A, dtype=np.int32)
+        self.Z = np.asarray(Z, dtype=np.int32)
+        self.mass = np.asarray(mass, dtype=np.float64)
+
+        # name -> (reactants, products), in file order
+        self.reactions = {}
+        # reactions whose rate also scales with rho * ye
+        self.electron_captures = set()
+        for name, (reactants, products, *flags) in reactions:
+            self.reactions[name] = (list(reactants), list(products))
+            if "ec" in flags:
+                self.electron_captures.add(name)
+
+        # name -> list of (label, coefficients)
+        self.sets = {name: [] for name in self.reactions}
+
+        # name -> (ln T9 grid, ln rate) on a uniform grid
+        self.tables = {}
+        for name, label, coeffs in sets:
+            self.add_set(name, coeffs, label, build=False)
+
+        self.build()
+
+    @classmethod
+    def load(cls, filename):
+        """Read nuclei, reactions and rate sets from a table file."""
+        names, A, Z, mass = [], [], [], []
+        reactions, sets, tables = [], [], []
+
+        with open(filename, "r") as f:
+            for line in f:
+                line = line.split("#")[0].split()
+                if not line:
+                    continue
+
+                if line[0] == "nucleus":
+                    names.append(line[1])
+                    A.append(int(line[2]))
+                    Z.append(int(line[3]))
+                    mass.append(float(line[4]))
+                elif line[0] == "reaction":
+                    reactions.append((line[1], (line[2].split(","), line[3].split(","), *line[4:])))
+                elif line[0] == "set":
+                    sets.append((line[1], line[2], [float(a) for a in line[3:10]]))
+                elif line[0] == "table":
+                    # table files are relative to the coefficient table
+                    tables.append((line[1], os.path.join(os.path.dirname(filename), line[2])))
+                else:
+                    raise ValueError(f"unknown entry '{line[0]}' in {filename}")
+
+        net = cls(names, A, Z, mass, reactions, sets)
+        for rate, table in tables:
+            net.load_table_rate(rate, table, replace=False)
+        return net
+
+    def save(self, filename):
+        """Write the current nuclei, reactions and rate sets to a table file."""
+        with open(filename, "w") as f:
+            f.write("# nucleus   name  A   Z   mass [erg]\n")
+            for i, name in enumerate(self.names):
+                f.write(f"nucleus  {name:5s} {self.A[i]:3d} {self.Z[i]:3d}  {float(self.mass[i])!r}\n")
+
+            f.write("#\n# reaction  name  reactants  products  [ec]\n")
+            for name, (reactants, products) in self.reactions.items():
+                flag = "  ec" if name in self.electron_captures else ""
+                f.write(f"reaction  {name:24s} {','.join(reactants):10s} {','.join(products)}{flag}\n")
+
+            f.write("#\n# set  reaction  label  a0  a1  a2  a3  a4  a5  a6\n")
+            for name, sets in self.sets.items():
+                for label, coeffs in sets:
+                    f.write(f"set  {name:24s} {label:6s} " + " ".join(repr(float(a)) for a in coeffs) + "\n")
+
+            if self.tables:
+                f.write("#\n# table  reaction  file (T9, N_A<sigma v>)\n")
+            for name, (grid, lnrate) in self.tables.items():
+                table = os.path.splitext(os.path.basename(filename))[0] + f"_{name}.dat"
+                np.savetxt(os.path.join(os.path.dirname(filename), table),
+                           np.column_stack((np.exp(grid), np.exp(lnrate))),
+                           header="T9  N_A<sigma v>")
+                f.write(f"table  {name:24s} {table}\n")
+
+    def index(self, name):
+        """Position of a nucleus in the abundance vector."""
+        return self.names.index(name)
+
+    def rate_sets(self, rate):
+        """Return the (label, coefficients) sets of a rate."""
+        return list(self.sets[rate])
+
+    def add_set(self, rate, coeffs, label="user", build=True):
+        """Add a 7-parameter REACLIB set to a rate."""
+        coeffs = np.asarray(coeffs, dtype=np.float64)
+        if coeffs.shape != (7,):
+            raise ValueError("a REACLIB set needs exactly 7 coefficients")
+        self.sets[rate].append((label, coeffs))
+        if build:
+            self.build()
+
+    def replace_rate(self, rate, sets, label="user"):
+        """Replace all the sets of a rate with new 7-parameter sets."""
+        self.sets[rate] = []
+        for coeffs in np.atleast_2d(sets):
+            self.add_set(rate, coeffs, label, build=False)
+        self.build()
+
+    def scale_rate(self, rate, factor):
+        """Multiply a rate by a constant factor (e.g. the enhanced 19F(p,g) case).
+
+        Both the REACLIB sets and the table of the rate, if any, are scaled.
+        """
+        self.sets[rate] = [(label, coeffs + np.array([np.log(factor), 0, 0, 0, 0, 0, 0]))
+                           for label, coeffs in self.sets[rate]]
+        if rate in self.tables:
+            grid, lnrate = self.tables[rate]
+            self.tables[rate] = (grid, lnrate + np.log(factor))
+        self.build()
+
+    def add_table_rate(self, rate, T9, values, npoints=None, replace=True):
+        """Use a tabulated N_A<sigma v> (on a T9 grid) for a rate.
+
+        The table is resampled in log space onto a uniform ln(T9) grid of
+        ``npoints`` points (by default four times the input size, or the
+        input grid itself if it is already uniform in ln T9).  With
+        ``replace`` the REACLIB sets of the rate are dropped, otherwise the
+        table is added on top of them.
+        """
+        lnT9 = np.log(np.asarray(T9, dtype=np.float64))
+        lnrate = np.log(np.maximum(np.asarray(values, dtype=np.float64), 1.e-300))
+        if lnT9.ndim != 1 or lnT9.shape != lnrate.shape:
+            raise ValueError(f"{rate}: T9 and the rate values must be 1D arrays of the same length")
+        if len(lnT9) < 2:
+            raise ValueError(f"{rate}: a rate table needs at least two temperatures, got {len(lnT9)}")
+
+        order = np.argsort(lnT9)
+        lnT9, lnrate = lnT9[order], lnrate[order]
+
+        step = np.diff(lnT9)
+        if npoints is None and np.allclose(step, step[0], rtol=1.e-6):
+            grid = lnT9
+        else:
+            grid = np.linspace(lnT9[0], lnT9[-1], npoints or 4 * len(lnT9))
+            lnrate = np.interp(grid, lnT9, lnrate)
+
+        if replace:
+            self.sets[rate] = []
+        self.tables[rate] = (grid, lnrate)
+        self.build()
+
+    def load_table_rate(self, rate, filename, **kwargs):
+        """Read a two column (T9, N_A<sigma v>) file and use it for a rate."""
+        table = np.loadtxt(filename, ndmin=2)
+        self.add_table_rate(rate, table[:, 0], table[:, 1], **kwargs)
+
+    def add_reaction(self, rate, reactants, products, sets=(), electron_capture=False):
+        """Add a new reaction with its REACLIB sets."""
+        self.reactions[rate] = (list(reactants), list(products))
+        if electron_capture:
+            self.electron_captures.add(rate)
+        self.sets[rate] = []
+        for coeffs in sets:
+            self.add_set(rate, coeffs, build=False)
+        self.build()
+
+    def build(self):
+        """Rebuild the arrays passed to the compiled kernels."""
+        nrates = len(self.reactions)
+        max_react = max(len(r) for r, _ in self.reactions.values())
+        max_prod = max(len(p) for _, p in self.reactions.values())
+
+        nreact = np.zeros(nrates, dtype=np.int32)
+        react = np.full((nrates, max_react), -1, dtype=np.int32)
+        nprod = np.zeros(nrates, dtype=np.int32)
+        prod = np.full((nrates, max_prod), -1, dtype=np.int32)
+        prefactor = np.ones(nrates, dtype=np.float64)
+        dens_pow = np.zeros(nrates, dtype=np.float64)
+        ec = np.zeros(nrates, dtype=np.bool_)
+
+        pairs = []
+        rate_pair = np.full((nrates, 2), -1, dtype=np.int32)
+
+        coeffs = []
+        set_rate = []
+
+        for r, (name, (reactants, products)) in enumerate(self.reactions.items()):
+            ir = [self.index(n) for n in reactants]
+            ip = [self.index(n) for n in products]
+
+            nreact[r] = len(ir)
+            react[r, :len(ir)] = ir
+            nprod[r] = len(ip)
+            prod[r, :len(ip)] = ip
+
+            # identical particles are counted once per pair
+            for n in set(ir):
+                prefactor[r] /= math.factorial(ir.count(n))
+            dens_pow[r] = len(ir) - 1
+            if name in self.electron_captures:
+                ec[r] = True
+                dens_pow[r] += 1
+
+            # screen on the charged reactants sorted by Z, as pynucastro does;
+            # a third one (3-alpha) is screened against the first two combined
+            charged = sorted((i for i in ir if self.Z[i] > 0), key=lambda i: self.Z[i])
+            if len(charged) > 1:
+                z1, a1 = self.Z[charged[0]], self.A[charged[0]]
+                z2, a2 = self.Z[charged[1]], self.A[charged[1]]
+                screen = [(z1, a1, z2, a2)]
+                if len(charged) == 3:
+                    screen.append((z1 + z2, a1 + a2, self.Z[charged[2]], self.A[charged[2]]))
+                for q, pair in enumerate(screen):
+                    pair = tuple(int(x) for x in pair)
+                    if pair not in pairs:
+                        pairs.append(pair)
+                    rate_pair[r, q] = pairs.index(pair)
+
+            for label, c in self.sets[name]:
+                coeffs.append(c)
+                set_rate.append(r)
+
+        self.rate_names = list(self.reactions)
+
+        # tables are padded to a common length by repeating the last point
+        ntab = len(self.tables)
+        npoints = max([len(grid) for grid, _ in self.tables.values()], default=2)
+        tab_rate = np.zeros(ntab, dtype=np.int32)
+        tab_lnT0 = np.zeros(ntab, dtype=np.float64)
+        tab_idlnT = np.zeros(ntab, dtype=np.float64)
+        tab_lnrate = np.zeros((ntab, npoints), dtype=np.float64)
+        for k, (name, (grid, lnrate)) in enumerate(self.tables.items()):
+            tab_rate[k] = self.rate_names.index(name)
+            tab_lnT0[k] = grid[0]
+            tab_idlnT[k] = (len(grid) - 1) / (grid[-1] - grid[0])
+            tab_lnrate[k, :len(grid)] = lnrate
+            tab_lnrate[k, len(grid):] = lnrate[-1]
+
+        # CSC structure of the Jacobian: column j holds the species touched by
+        # every reaction that has j as a reactant
+        pattern = set()
+        for r in range(nrates):
+            for m in range(nreact[r]):
+                for i in list(react[r, :nreact[r]]) + list(prod[r, :nprod[r]]):
+                    pattern.add((int(react[r, m]), int(i)))
+        pattern = sorted(pattern)
+        position = {entry: k for k, entry in enumerate(pattern)}
+
+        self.jac_indices = np.array([i for _, i in pattern], dtype=np.int32)
+        self.jac_indptr = np.searchsorted([j for j, _ in pattern],
+                                          np.arange(self.nnuc + 1)).astype(np.int32)
+
+        jac_pos = np.zeros((nrates, max_react, max_react + max_prod), dtype=np.int32)
+        for r in range(nrates):
+            targets = list(react[r, :nreact[r]]) + list(prod[r, :nprod[r]])
+            for m in range(nreact[r]):
+                for n, i in enumerate(targets):
+                    jac_pos[r, m, n] = position[(int(react[r, m]), int(i))]
+
+        # the screening factors depend only on the pair, so they are made
+        # once here rather than on every screened call
+        screen_factors = List.empty_list(ScreenFactors.class_type.instance_type)
+        for pair in pairs:
+            screen_factors.append(ScreenFactors(*pair))
+
+        self.data = NetworkData(np.array(coeffs, dtype=np.float64).reshape(-1, 7),
+                                np.array(set_rate, dtype=np.int32),
+                                nreact, react, nprod, prod, prefactor, dens_pow,
+                                ec, self.A, self.Z,
+                                np.array(pairs, dtype=np.int64).reshape(-1, 4),
+                                screen_factors, rate_pair,
+                                tab_rate, tab_lnT0, tab_idlnT, tab_lnrate,
+                                np.full((ntab, 4), np.nan),
+                                jac_pos, len(pattern), self.mass)
+
+        # shared by the calls made through this object, so not thread safe
+        self.work = make_workspace(self.data)
+
+    def rates(self, T, Y=None, rho=None, screen_func=None):
+        """Rates of all reactions at temperature T, screened if asked to."""
+        if screen_func is None:
+            Y = np.ones(self.nnuc)
+            rho = 1.0
+        return evaluate_rates(Y, rho, T, screen_func, self.data)
+
+    def rhs(self, t, Y, rho, T, screen_func=None):
+        dYdt = np.empty(self.nnuc, dtype=np.float64)
+        rhs_into(dYdt, t, Y, rho, T, screen_func, self.data, self.work)
+        return dYdt
+
+    def rhs_into(self, out, t, Y, rho, T, screen_func=None):
+        """Write dY/dt into a preallocated ``out`` array."""
+        rhs_into(out, t, Y, rho, T, screen_func, self.data, self.work)
+        return out
+
+    def jacobian(self, t, Y, rho, T, screen_func=None):
+        jac = np.empty((self.nnuc, self.nnuc), dtype=np.float64)
+        jacobian_into(jac, t, Y, rho, T, screen_func, self.data, self.work)
+        return jac
+
+    def jacobian_into(self, out, t, Y, rho, T, screen_func=None):
+        """Write the Jacobian into a preallocated (nnuc, nnuc) ``out`` array."""
+        jacobian_into(out, t, Y, rho, T, screen_func, self.data, self.work)
+        return out
+
+    def jacobian_sparsity(self):
+        """Sparsity pattern of the Jacobian, for solve_ivp's ``jac_sparsity``."""
+        return sparse.csc_matrix((np.ones(len(self.jac_indices)), self.jac_indices, self.jac_indptr),
+                                 shape=(self.nnuc, self.nnuc))
+
+    def jacobian_sparse(self, t, Y, rho, T, screen_func=None):
+        """Jacobian as a CSC matrix, for the sparse LU path of BDF and Radau."""
+        values = np.empty(self.data.jac_nnz, dtype=np.float64)
+        jacobian_sparse_into(values, t, Y, rho, T, screen_func, self.data, self.work)
+        return sparse.csc_matrix((values, self.jac_indices, self.jac_indptr),
+                                 shape=(self.nnuc, self.nnuc))
+
+    def heating_rhs(self, t, y, rho, cv, screen_func=None):
+        """Right hand side of the self-heating system, y = (Y_0 ... Y_n-1, T).
+
+        The temperature follows dT/dt = eps_nuc / cv with cv the specific
+        heat in erg/g/K, so solve_ivp is called with ``args=(rho, cv,
+        screen_func)``.
+        """
+        dydt = np.empty(self.nnuc + 1, dtype=np.float64)
+        heating_rhs_into(dydt, t, y, rho, cv, screen_func, self.data, self.work)
+        return dydt
+
+    def heating_rhs_into(self, out, t, y, rho, cv, screen_func=None):
+        """Write the self-heating right hand side into ``out``."""
+        heating_rhs_into(out, t, y, rho, cv, screen_func, self.data, self.work)
+        return out
+
+    def heating_jacobian(self, t, y, rho, cv, screen_func=None):
+        """Jacobian of ``heating_rhs``, (nnuc + 1) x (nnuc + 1).
+
+        The derivatives of the unscreened rates with respect to T are
+        analytic.  The derivative of the screening factors is analytic only
+        for ``screen_weak`` (the functions in ``screen_derivatives``); for
+        the pynucastro screening functions (screen5, chugunov_2007, ...) it
+        is a central difference over a relative step ``screen_dlnT`` = 1e-4
+        in T, accurate to about 1e-8 relative.
+        """
+        jac = np.empty((self.nnuc + 1, self.nnuc + 1), dtype=np.float64)
+        return self.heating_jacobian_into(jac, t, y, rho, cv, screen_func)
+
+    def heating_jacobian_into(self, out, t, y, rho, cv, screen_func=None):
+        """Write the self-heating Jacobian into ``out``."""
+        dscreen_func = screen_derivatives.get(screen_func)
+        heating_jacobian_into(out, t, y, rho, cv, screen_func, dscreen_func,
+                              self.data, self.work)
+        return out
+
+    def ye(self, Y):
+        return np.sum(self.Z * Y) / np.sum(self.A * Y)
+
+    def energy_release(self, dY):
+        """return the energy release in erg/g (/s if dY is actually dY/dt)"""
+        return -np.dot(dY, self.mass) * constants.Avogadro
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from scipy.integrate import BDF
+
+from checkpoint import Checkpoint, _restore, integrate
+
+rtol, atol = 1.e-6, 1.e-10
+
+
+def robertson(t, y):
+    return [-0.04 * y[0] + 1.e4 * y[1] * y[2],
+            0.04 * y[0] - 1.e4 * y[1] * y[2] - 3.e7 * y[1]**2,
+            3.e7 * y[1]**2]
+
+
+def robertson_jac(t, y):
+    return [[-0.04, 1.e4 * y[2], 1.e4 * y[1]],
+            [0.04, -1.e4 * y[2] - 6.e7 * y[1], -1.e4 * y[1]],
+            [0.0, 6.e7 * y[1], 0.0]]
+
+
+class Crash(Exception):
+    pass
+
+
+def crashing(ncalls):
+    calls = [0]
+
+    def fun(t, y):
+        calls[0] += 1
+        if calls[0] > ncalls:
+            raise Crash
+        return robertson(t, y)
+    return fun
+
+
+def test_restart_agrees_within_tolerance(tmp_path):
+    t_eval = np.geomspace(1.e-4, 1.e5, 20)
+    options = dict(jac=robertson_jac, rtol=rtol, atol=atol)
+    reference = integrate(robertson, [0, 1.e5], [1, 0, 0], t_eval=t_eval, **options)
+
+    checkpoint = Checkpoint(tmp_path, "robertson", interval=None, every=10)
+    with pytest.raises(Crash):
+        integrate(crashing(300), [0, 1.e5], [1, 0, 0], t_eval=t_eval, checkpoint=checkpoint, **options)
+    saved = checkpoint.load()
+    assert 0 < float(saved["t"]) < 1.e5
+
+    sol = integrate(robertson, [0, 1.e5], [1, 0, 0], t_eval=t_eval, checkpoint=checkpoint, **options)
+    assert sol.success and sol.restarted
+    np.testing.assert_array_equal(sol.t, reference.t)
+    np.testing.assert_allclose(sol.y, reference.y, rtol=10 * rtol, atol=10 * atol)
+    assert checkpoint.completed()
+
+
+def test_restore_keeps_state_and_step(tmp_path):
+    checkpoint = Checkpoint(tmp_path, "robertson", interval=None, every=10)
+    with pytest.raises(Crash):
+        integrate(crashing(200), [0, 1.e5], [1, 0, 0], jac=robertson_jac,
+                  rtol=rtol, atol=atol, checkpoint=checkpoint)
+    state = checkpoint.load()
+
+    solver = BDF(robertson, float(state["t"]), state["y"], 1.e5, jac=robertson_jac, rtol=rtol, atol=atol)
+    _restore(solver, state)
+    assert solver.t == float(state["t"])
+    assert solver.h_abs == float(state["h_abs"])
+    assert solver.order == int(state["order"])
+    np.testing.assert_array_equal(solver.D, state["D"])
@@ -0,0 +1,88 @@
+import os
+
+import numpy as np
+import pytest
+
+from pynucastro.screening import PlasmaState, ScreenFactors, chugunov_2007, screen5
+
+from reaclib_network import ReaclibNetwork, screen_weak, tabular_rates
+
+here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def net():
+    net = ReaclibNetwork.load(os.path.join(here, "data", "cno_reaclib.dat"))
+    T9 = np.geomspace(0.05, 0.5, 31)
+    net.add_table_rate("F19__p_O18", T9, 1.e-3 * T9**4)
+    return net
+
+
+def table_rates(net, T):
+    d = net.data
+    rates = np.zeros(len(net.rate_names))
+    drates = np.zeros(len(net.rate_names))
+    tabular_rates(d.tab_rate, d.tab_lnT0, d.tab_idlnT, d.tab_lnrate, d.tab_cache, T, rates, drates)
+    r = net.rate_names.index("F19__p_O18")
+    return rates[r], drates[r]
+
+
+def test_table_derivative_inside(net):
+    T = 2.e8
+    rate, drate = table_rates(net, T)
+    h = 1.e-6 * T
+    fd = (table_rates(net, T + h)[0] - table_rates(net, T - h)[0]) / (2 * h)
+    assert drate == pytest.approx(fd, rel=1.e-6)
+
+
+@pytest.mark.parametrize("T", [1.e7, 2.e9])
+def test_table_derivative_clamped(net, T):
+    rate, drate = table_rates(net, T)
+    assert rate > 0
+    assert drate == 0.0
+
+
+def test_scale_table_rate(net):
+    T = 2.e8
+    rate, drate = table_rates(net, T)
+    grid, lnrate = net.tables["F19__p_O18"]
+    try:
+        net.scale_rate("F19__p_O18", 10.0)
+        scaled, dscaled = table_rates(net, T)
+        assert scaled == pytest.approx(10 * rate, rel=1.e-12)
+        assert dscaled == pytest.approx(10 * drate, rel=1.e-12)
+    finally:
+        net.tables["F19__p_O18"] = (grid, lnrate)
+        net.build()
+
+
+def test_table_rate_needs_two_points(net):
+    with pytest.raises(ValueError, match="at least two"):
+        net.add_table_rate("F19__p_O18", [0.1], [1.e-3])
+
+
+@pytest.mark.parametrize("screen", [screen5, screen_weak])
+def test_screening_uses_the_pair_factors(net, screen):
+    T, rho = 2.e8, 1.e4
+    Y = np.full(net.nnuc, 0.01)
+    r = net.rate_names.index("p_F19__He4_O16")
+    factor = net.rates(T, Y, rho, screen)[r] / net.rates(T)[r]
+    expected = screen(PlasmaState(T, rho, Y, net.Z), ScreenFactors(1, 1, 9, 19))
+    assert factor == pytest.approx(expected, rel=1.e-12)
+    assert len(net.data.screen_factors) == net.data.pairs.shape[0]
+
+
+@pytest.mark.parametrize("screen", [screen5, chugunov_2007])
+def test_screening_temperature_derivative(net, screen):
+    T, rho = 2.e8, 1.e4
+    Y = np.full(net.nnuc, 0.01)
+    net.heating_jacobian(0.0, np.append(Y, T), rho, 1.e8, screen)
+
+    def lnscor(T, pair):
+        return np.log(screen(PlasmaState(T, rho, Y, net.Z), ScreenFactors(*pair)))
+
+    for p, pair in enumerate(net.data.pairs):
+        # Richardson extrapolation of two central differences
+        d = [(lnscor(T * (1 + h), pair) - lnscor(T * (1 - h), pair)) / (2 * h * T) for h in (2.e-3, 1.e-3)]
+        reference = (4 * d[1] - d[0]) / 3
+        assert net.work.dscor[p] == pytest.approx(reference, rel=1.e-7)
@@ -0,0 +1,10 @@
+import pytest
+
+from tracers import run_tracer
+
+
+def test_single_point_trajectory(tmp_path):
+    filename = tmp_path / "tracer_1.dat"
+    filename.write_text("0.0 1.e9 1.e6\n")
+    with pytest.raises(ValueError, match="at least two points"):
+        run_tracer(str(filename), {"p": 1.0})
@@ -0,0 +1,232 @@
+"""Post-process stellar-model tracer trajectories with the reaction network.
+
+Each trajectory is a text file with columns t [s], T [K] and rho [g/cm^3].
+The files in a directory are run in a process pool, largest first so the
+long trajectories do not end up last, with T and rho interpolated in
+log space along the history.  As each tracer finishes its final mass
+fractions are appended to ``yields.dat`` and its snapshots to
+``snapshots.dat`` in the output directory; tracers already listed in
+``yields.dat`` are skipped, so an interrupted run can simply be restarted.
+"""
+
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pynucastro.screening
+
+import reaclib_network
+from checkpoint import Checkpoint, integrate
+from reaclib_network import ReaclibNetwork
+
+# network of the worker process, loaded once by the pool initializer
+_net = None
+
+
+def discover(directory, pattern="*.dat"):
+    """Trajectory files in a directory, largest first."""
+    files = glob.glob(os.path.join(directory, pattern))
+    return sorted(files, key=lambda f: (-os.path.getsize(f), f))
+
+
+def tracer_name(filename):
+    return os.path.splitext(os.path.basename(filename))[0]
+
+
+def read_trajectory(filename):
+    """Read the t, T and rho columns of a trajectory file."""
+    t, T, rho = np.loadtxt(filename, usecols=(0, 1, 2), unpack=True, ndmin=2)
+    return t, T, rho
+
+
+def conditions(t, T, rho):
+    """Return T(time) and rho(time), interpolated linearly in log T, log rho."""
+    lnT = np.log(T)
+    lnrho = np.log(rho)
+
+    def temperature(time):
+        return np.exp(np.interp(time, t, lnT))
+
+    def density(time):
+        return np.exp(np.interp(time, t, lnrho))
+
+    return temperature, density
+
+
+def initial_abundances(net, X0):
+    """Molar fractions from a dict of initial mass fractions."""
+    Y0 = np.zeros(net.nnuc)
+    for name, X in X0.items():
+        Y0[net.index(name)] = X / net.A[net.index(name)]
+    return Y0
+
+
+def screening(name):
+    """Look up a screening function by name, in reaclib_network (e.g.
+    "screen_weak") or pynucastro.screening (e.g. "screen5").
+
+    Compiled functions cannot be sent to the worker processes, so the
+    pipeline passes screening around by name.
+    """
+    if name is None:
+        return None
+    if hasattr(reaclib_network, name):
+        return getattr(reaclib_network, name)
+    return getattr(pynucastro.screening, name)
+
+
+def _init(network):
+    global _net
+    _net = ReaclibNetwork.load(network)
+
+
+def run_tracer(filename, X0, nsnapshots=10, screen=None,
+               rtol=1.e-8, atol=1.e-20, checkpoint_dir=None, net=None):
+    """Integrate the network along one trajectory.
+
+    ``screen`` is the name of the screening function (see ``screening``).
+
+    Returns the tracer name, the snapshot times with T, rho and mass
+    fractions there (the last one is the final composition), the number
+    of rhs calls and the time spent.
+    """
+    if net is None:
+        net = _net
+
+    start = time.perf_counter()
+    screen_func = screening(screen)
+    t, T, rho = read_trajectory(filename)
+    if len(t) < 2:
+        raise ValueError(f"{filename}: a trajectory needs at least two points, got {len(t)}")
+    temperature, density = conditions(t, T, rho)
+
+    def rhs(time, Y):
+        return net.rhs(time, Y, density(time), temperature(time), screen_func)
+
+    def jac(time, Y):
+        return net.jacobian(time, Y, density(time), temperature(time), screen_func)
+
+    # log-spaced snapshots, always ending at the last point of the history
+    times = np.geomspace(max(t[1] - t[0], 1.e-30), t[-1] - t[0], nsnapshots) + t[0]
+    times[-1] = t[-1]
+
+    checkpoint = None
+    if checkpoint_dir is not None:
+        checkpoint = Checkpoint(checkpoint_dir, tracer_name(filename))
+
+    sol = integrate(rhs, [t[0], t[-1]], initial_abundances(net, X0), method="BDF",
+                    t_eval=times, jac=jac, rtol=rtol, atol=atol, checkpoint=checkpoint)
+    if not sol.success:
+        raise RuntimeError(f"{filename}: {sol.message}")
+
+    X = sol.y.T * net.A
+    return {"name": tracer_name(filename),
+            "t": sol.t, "T": temperature(sol.t), "rho": density(sol.t), "X": X,
+            "nfev": int(sol.nfev), "time": time.perf_counter() - start}
+
+
+def completed(output):
+    """Names of the tracers already in ``yields.dat``.
+
+    A line cut short by an interrupted write is dropped from the file.
+    """
+    path = os.path.join(output, "yields.dat")
+    if not os.path.exists(path):
+        return set()
+
+    with open(path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+
+    names = set()
+    for line in data[:end].decode().splitlines():
+        if line and not line.startswith("#"):
+            names.add(line.split()[0])
+
+    # snapshots of a tracer that did not make it to yields.dat are redone
+    path = os.path.join(output, "snapshots.dat")
+    if os.path.exists(path):
+        with open(path) as f:
+            lines = [line for line in f if line.endswith("\n") and
+                     (line.startswith("#") or line.split()[0] in names)]
+        with open(path + ".tmp", "w") as f:
+            f.writelines(lines)
+        os.replace(path + ".tmp", path)
+
+    return names
+
+
+def _append(filename, header, lines):
+    # one write per tracer, so a tracer is either fully there or not at all
+    new = not os.path.exists(filename)
+    with open(filename, "a") as f:
+        f.write((header if new else "") + "".join(lines))
+        f.flush()
+
+
+def write_result(output, names, result):
+    """Append a finished tracer to ``yields.dat`` and ``snapshots.dat``."""
+    # snapshots first, so a tracer listed in yields.dat is complete
+    columns = "  ".join(names)
+    _append(os.path.join(output, "snapshots.dat"),
+            f"# tracer  t  T  rho  {columns}\n",
+            [f"{result['name']}  {float(t)!r}  {float(T)!r}  {float(rho)!r}  " + "  ".join(repr(float(x)) for x in X) + "\n"
+             for t, T, rho, X in zip(result["t"], result["T"], result["rho"], result["X"])])
+    _append(os.path.join(output, "yields.dat"),
+            f"# tracer  {columns}\n",
+            [f"{result['name']}  " + "  ".join(repr(float(x)) for x in result["X"][-1]) + "\n"])
+
+
+def process(directory, network, X0, output, pattern="*.dat", workers=None,
+            nsnapshots=10, screen=None, rtol=1.e-8, atol=1.e-20,
+            checkpoint_dir=None, verbose=True):
+    """Run every trajectory in ``directory`` through the network table ``network``.
+
+    ``X0`` maps nucleus names to initial mass fractions and ``screen``
+    names the screening function, if any.  Results are
+    streamed to ``output`` as the tracers finish and the throughput is
+    printed; returns a dict with the number of tracers run, skipped and
+    failed, the wall time and tracers per second.  With ``checkpoint_dir``
+    each tracer also checkpoints its integration, so long trajectories
+    interrupted halfway resume where they were.
+    """
+    os.makedirs(output, exist_ok=True)
+    names = ReaclibNetwork.load(network).names
+
+    done = completed(output)
+    files = [f for f in discover(directory, pattern) if tracer_name(f) not in done]
+
+    start = time.perf_counter()
+    failed = []
+    ncalls = 0
+    with ProcessPoolExecutor(workers, initializer=_init, initargs=(network,)) as pool:
+        # submitted largest first, the pool hands them out in that order
+        futures = {pool.submit(run_tracer, f, X0, nsnapshots, screen,
+                               rtol, atol, checkpoint_dir): f for f in files}
+
+        for n, future in enumerate(as_completed(futures), 1):
+            try:
+                result = future.result()
+            except Exception as error:
+                failed.append(futures[future])
+                if verbose:
+                    print(f"{tracer_name(futures[future])} failed: {error}")
+                continue
+
+            write_result(output, names, result)
+            ncalls += result["nfev"]
+
+            if verbose:
+                elapsed = time.perf_counter() - start
+                rate = n / elapsed
+                print(f"{n}/{len(files)}  {result['name']}  {result['time']:.2f} s  "
+                      f"{rate:.2f} tracers/s  ETA {(len(files) - n) / rate:.0f} s")
+
+    elapsed = time.perf_counter() - start
+    return {"run": len(files) - len(failed), "skipped": len(done), "failed": failed,
+            "time": elapsed, "rhs_calls": ncalls,
+            "throughput": (len(files) - len(failed)) / elapsed if elapsed > 0 else 0.0}
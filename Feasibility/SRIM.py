@@ -1,66 +1,128 @@
 import re
 import numpy as np
+from scipy.interpolate import PchipInterpolator
+
+from datastore import default_store
 
 class SRIM:
 
-    def __init__(self, filename):
+    # number of (column, derivative, energies) results kept by evaluate
+    cache_size = 16
+
+    # columns of the parsed table and their units, as kept in the data store
+    columns = ['energy', 'dedx', 'dedx_nuclear', 'range', 'longitudinal_straggle', 'lateral_straggle']
+    units = ['keV', 'eV/(1e15 atoms/cm2)', 'eV/(1e15 atoms/cm2)', 'A', 'A', 'A']
+
+    def __init__(self, filename, store=None):
         self.filename = filename
+        self.store = store or default_store()
         self.data = []
+        self.density = None
         self.parse()
+        self.build_splines()
 
     def parse(self):
-        
-        with open(self.filename, 'r') as file:
-            lines = file.readlines()
 
-        table_start_pattern = re.compile(r'\s*Energy\s+Elec\.\s+Nuclear\s+Range\s+Straggling\s+Straggling')
-        table_stop_pattern = re.compile(r'\s*Multiply Stopping by')
+        # parsed once into the data store, see datastore.DataStore
+        name = self.store.add_file(self.filename, SRIM.parse_sources, SRIM.columns, SRIM.units)
+        self.data = self.store.load(name)
+        self.density = self.store.attrs(name)['density']
+
+    @staticmethod
+    def parse_sources(sources):
+        data, density = SRIM.parse_table(sources[0])
+        return data, {'density': density}
+
+    @staticmethod
+    def parse_table(filename):
+
+        with open(filename, 'r', encoding='latin-1') as file:
+            text = file.read()
+
+        # atoms/cm3, to turn the stopping per areal density into per length
+        density = re.search(r'Target Density\s*=.*=\s*(\S+)\s+atoms/cm3', text)
+        density = float(density.group(1).replace(',', '.')) if density else np.nan
+
+        # the table sits between the column header (and its dashed line)
+        # and the dashed line before "Multiply Stopping by"
+        header = re.search(r'^\s*Energy\s+Elec\.\s+Nuclear\s+Range\s+Straggling\s+Straggling.*\n.*\n', text, re.M)
+        footer = re.search(r'^-+\s*\n\s*Multiply Stopping by', text[header.end():], re.M)
+        table = text[header.end():header.end() + footer.start()]
+
+        # decimal commas, then one token array for the whole table
+        tokens = np.array(table.replace(',', '.').split()).reshape(-1, 10)
 
-        table_start = None
-        table_stop = None
-        
-        for i, line in enumerate(lines):
+        energy_units = {'eV': 1e-3, 'keV': 1., 'MeV': 1e3, 'GeV': 1e6}
+        length_units = {'A': 1., 'um': 1e4, 'mm': 1e7, 'm': 1e10, 'km': 1e13}
 
-            table_match = table_start_pattern.match(line)
-            if table_match:
-                table_start = i + 2
+        array = tokens[:, [0, 2, 3, 4, 6, 8]].astype(float)
+        array[:, 0] *= np.vectorize(energy_units.get)(tokens[:, 1])
+        for column, unit in zip([3, 4, 5], [5, 7, 9]):
+            array[:, column] *= np.vectorize(length_units.get)(tokens[:, unit])
 
-            table_match = table_stop_pattern.match(line)
-            if table_match:
-                table_stop = i - 2
-        
-        table = lines[table_start:table_stop]
+        return array, density
 
-        array = np.zeros((len(table), 6))
-        for i, line in enumerate(table):
+    def build_splines(self):
 
-            line = line.replace(',', '.')
-            line = line.split()
+        # built on first use of each column, so loading a table stays cheap
+        self.splines = {}
+        self.cache = {}
 
-            if( line[1] == 'keV'):
-                array[i, 0] = float(line[0])
-            elif( line[1] == 'MeV'):
-                array[i, 0] = float(line[0]) * 1000
+    def spline(self, column):
 
-            array[i, 1] = float(line[2])
-            array[i, 2] = float(line[3])
+        # Monotone (PCHIP) splines in log-log, so the stopping is smooth and
+        # does not overshoot between the table points; columns with zeros
+        # (nuclear stopping of H at high energy) are splined linearly in value
+        if column not in self.splines:
+            x = np.log(self.get_energy())
+            values = self.data[:, column]
+            log = bool(np.all(values > 0))
+            spline = PchipInterpolator(x, np.log(values) if log else values)
+            self.splines[column] = (spline, spline.derivative(), log)
 
-            if( line[5] == 'A'):
-                array[i, 3] = float(line[4])
-            elif( line[5] == 'um'):
-                array[i, 3] = float(line[4]) * 10000
+        return self.splines[column]
 
-            if( line[7] == 'A'):
-                array[i, 4] = float(line[6])
-            elif( line[7] == 'um'):
-                array[i, 4] = float(line[6]) * 10000
+    def evaluate(self, column, energy, derivative=False):
 
-            if( line[9] == 'A'):
-                array[i, 5] = float(line[8])
-            elif( line[9] == 'um'):
-                array[i, 5] = float(line[8]) * 10000
+        # same energies as a recent call: reuse the result, keyed by the
+        # bytes of the energies; scalars are cheaper to evaluate than to key
+        scalar = np.ndim(energy) == 0
+        energy = np.asarray(energy, dtype=float)
+        if not scalar:
+            key = (column, derivative, energy.shape, energy.tobytes())
+            if key in self.cache:
+                return self.cache[key].copy()
 
-        self.data = array
+        spline, dspline, log = self.spline(column)
+
+        # constant outside the table, as np.interp is
+        table = self.get_energy()
+        clipped = np.clip(energy, table[0], table[-1])
+        x = np.log(clipped)
+
+        values = spline(x)
+        if log:
+            values = np.exp(values)
+
+        if derivative:
+            # chain rule back from d/dlog(E) to d/dE
+            dvalues = dspline(x) / clipped
+            if log:
+                dvalues *= values
+            values = np.where((energy < table[0]) | (energy > table[-1]), 0.0, dvalues)
+
+        if scalar:
+            return float(values)
+
+        # callers get their own copy, free to change in place
+        self.cache[key] = values
+        while len(self.cache) > self.cache_size:
+            del self.cache[next(iter(self.cache))]
+
+        return values.copy()
+
+    def get_density(self):
+        return self.density
 
     def get_data(self):
         return self.data
@@ -83,21 +145,89 @@ class SRIM:
     def get_lateral_straggle(self):
         return self.data[:,5]
     
-    def eval( self, energy ):
-        return np.interp(energy, self.get_energy(), self.get_dedx())
+    def eval( self, energy, derivative=False ):
+        return self.evaluate(1, energy, derivative)
     
-    def eval_nuclear( self, energy ):
-        return np.interp(energy, self.get_energy(), self.get_dedx_nuclear())
+    def eval_nuclear( self, energy, derivative=False ):
+        return self.evaluate(2, energy, derivative)
     
-    def eval_range( self, energy ):
-        return np.interp(energy, self.get_energy(), self.get_projected_range())
+    def eval_range( self, energy, derivative=False ):
+        return self.evaluate(3, energy, derivative)
     
-    def eval_longitudinal_straggle( self, energy ):
-        return np.interp(energy, self.get_energy(), self.get_longitudinal_straggle())
+    def eval_longitudinal_straggle( self, energy, derivative=False ):
+        return self.evaluate(4, energy, derivative)
     
-    def eval_lateral_straggle( self, energy ):
-        return np.interp(energy, self.get_energy(), self.get_lateral_straggle())
+    def eval_lateral_straggle( self, energy, derivative=False ):
+        return self.evaluate(5, energy, derivative)
     
-    def eval_total_straggle( self, energy ):
-        return np.interp(energy, self.get_energy(), self.get_dedx() + self.get_dedx_nuclear())
+    def eval_total_straggle( self, energy, derivative=False ):
+        return self.eval(energy, derivative) + self.eval_nuclear(energy, derivative)
     
+
+
+class CompoundStopping:
+
+    # Stopping power of a compound from its elements by Bragg's rule,
+    # eps = sum_i n_i eps_i, e.g. TaF6 = [(H_in_Ta, 1), (H_in_F, 6)].
+    # All the components are resampled once onto a shared grid uniform in
+    # log(E), so evaluating is a single O(1) lookup and a linear
+    # interpolation in log-log, whatever the number of components.
+
+    def __init__(self, components, npoints=2000, nuclear=False, grid=None, values=None):
+        self.names = [getattr(table, 'filename', str(table)) for table, _ in components]
+        self.weights = np.array([weight for _, weight in components], dtype=float)
+        self.nuclear = nuclear
+
+        if grid is None:
+            # only where every component is tabulated
+            emin = max(table.get_energy()[0] for table, _ in components)
+            emax = min(table.get_energy()[-1] for table, _ in components)
+            grid = np.geomspace(emin, emax, npoints)
+
+            values = np.zeros(npoints)
+            for (table, _), weight in zip(components, self.weights):
+                values += weight * table.eval(grid)
+                if nuclear:
+                    values += weight * table.eval_nuclear(grid)
+
+        self.grid = np.asarray(grid, dtype=float)
+        self.values = np.asarray(values, dtype=float)
+
+        self.log_grid = np.log(self.grid)
+        self.log_values = np.log(self.values)
+        self.step = self.log_grid[1] - self.log_grid[0]
+
+    def eval( self, energy, derivative=False ):
+        scalar = np.ndim(energy) == 0
+        energy = np.asarray(energy, dtype=float)
+
+        # constant outside the grid, as np.interp is
+        clipped = np.clip(energy, self.grid[0], self.grid[-1])
+        x = (np.log(clipped) - self.log_grid[0]) / self.step
+        i = np.minimum(x.astype(int), len(self.grid) - 2)
+        f = x - i
+
+        slope = self.log_values[i + 1] - self.log_values[i]
+        values = np.exp(self.log_values[i] + f * slope)
+
+        if derivative:
+            # d eps/dE = eps dlog(eps)/dlog(E) / E
+            values = values * slope / self.step / clipped
+            values = np.where((energy < self.grid[0]) | (energy > self.grid[-1]), 0.0, values)
+
+        return float(values) if scalar else values
+
+    def __call__( self, energy ):
+        return self.eval(energy)
+
+    def save(self, filename):
+        with open(filename, 'wb') as f:
+            np.savez(f, grid=self.grid, values=self.values, names=np.array(self.names),
+                     weights=self.weights, nuclear=self.nuclear)
+
+    @classmethod
+    def load(cls, filename):
+        with np.load(filename) as f:
+            stopping = cls([(str(name), weight) for name, weight in zip(f['names'], f['weights'])],
+                           nuclear=bool(f['nuclear']), grid=f['grid'], values=f['values'])
+        return stopping
@@ -0,0 +1,194 @@
+"""Columnar binary store of the tables read by the analyses.
+
+Every analysis starts by reading text tables: the extrapolations and the
+measured cross sections, the SRIM stopping tables and the SRIM RANGE_3D
+files of the implanted targets.  A ``DataStore`` parses each of them once
+and keeps it under one table name, one ``.npy`` file per column in
+``.datastore/``.  ``manifest.json`` there lists every table with its
+columns, their units, the parser that read it and the size and mtime of its
+sources; a column is memory mapped on first access, and a table is parsed
+again when a source, the parser or the store layout ``STORE_VERSION``
+changes.
+
+    extrap_pa2 = loadtxt( "extrap/19f_pa2.extrap" )
+    sigma = default_store().column( "Feasibility/extrap/19f_pa2", "sigma" )
+"""
+
+import json
+import os
+import re
+
+import numpy as np
+
+# version of the parsers and of the store layout, kept in the manifest:
+# bump it when either changes so that every table is parsed again
+STORE_VERSION = 1
+
+here = os.path.dirname( os.path.abspath( __file__ ) )
+repository = os.path.dirname( here )
+
+# columns and units of the text tables, by the directory they sit in: the
+# AZURE2 extrapolations (angle 0 for angle integrated) and the measured
+# cross sections in the AZURE2 data layout
+layouts = {
+    "extrap": ( [ "E_cm", "E_x", "theta_cm", "sigma", "S" ], [ "MeV", "MeV", "deg", "b", "MeV b" ] ),
+    "data": ( [ "E_lab", "theta", "sigma", "dsigma" ], [ "MeV", "deg", "b", "b" ] ),
+}
+
+
+def table_name( filename ):
+    """Name of the table of a file: its path from the repository root
+    without the extension, or its absolute path for files outside it."""
+    path = os.path.splitext( os.path.abspath( filename ) )[0]
+    relative = os.path.relpath( path, repository )
+    if relative.startswith( os.pardir ):
+        return path
+    return relative.replace( os.sep, "/" )
+
+
+def _parser_name( parser ):
+    return f"{parser.__module__}.{parser.__qualname__}"
+
+
+def _stat( sources ):
+    return [ [ os.stat( source ).st_size, os.stat( source ).st_mtime_ns ] for source in sources ]
+
+
+class DataStore:
+    """Tables parsed once into memory mapped columns under ``root``.
+
+    A table is registered with its sources and a parser taking the list of
+    sources and returning either a 2D array, one column per name, or an
+    ``( array, attrs )`` pair with a dict of scalars kept in the manifest.
+    """
+
+    def __init__( self, root=os.path.join( here, ".datastore" ) ):
+        self.root = root
+        self.tables = {}
+        self.mapped = {}
+
+        manifest = os.path.join( root, "manifest.json" )
+        self.manifest = { "version": STORE_VERSION, "tables": {} }
+        if os.path.exists( manifest ):
+            with open( manifest ) as f:
+                stored = json.load( f )
+            # another layout: every table is parsed again
+            if stored.get( "version" ) == STORE_VERSION:
+                self.manifest = stored
+
+    def register( self, name, sources, parser, columns=None, units=None ):
+        """Add a table, built from ``parser( sources )`` on first access."""
+        sources = [ os.path.abspath( source ) for source in sources ]
+        self.tables[name] = ( sources, parser, columns, units )
+        return name
+
+    def add_file( self, filename, parser, columns=None, units=None ):
+        """Register the table of one file under its ``table_name``."""
+        return self.register( table_name( filename ), [ filename ], parser, columns, units )
+
+    def stale( self, name ):
+        sources, parser, columns, units = self.tables[name]
+        entry = self.manifest["tables"].get( name )
+        if entry is None or entry["parser"] != _parser_name( parser ) or entry["sources"] != sources:
+            return True
+        if columns is not None and entry["columns"] != list( columns ):
+            return True
+        if entry["stat"] != _stat( sources ):
+            return True
+        return not all( os.path.exists( os.path.join( self.root, f ) ) for f in entry["files"] )
+
+    def ensure( self, name ):
+        """Manifest entry of a table, parsing its sources when it is stale."""
+        if not self.stale( name ):
+            return self.manifest["tables"][name]
+
+        sources, parser, columns, units = self.tables[name]
+        result = parser( sources )
+        array, attrs = result if isinstance( result, tuple ) else ( result, {} )
+        array = np.asarray( array, dtype=float )
+        if array.ndim == 1:
+            array = array[:,None]
+
+        if columns is None:
+            columns = [ str( i ) for i in range( array.shape[1] ) ]
+        if units is None:
+            units = [ "" ] * len( columns )
+        if len( columns ) != array.shape[1] or len( units ) != len( columns ):
+            raise ValueError( f"{name}: {array.shape[1]} columns parsed, {len( columns )} names and {len( units )} units given" )
+
+        stem = re.sub( r"[^\w.-]+", "_", name.strip( os.sep ) )
+        files = [ f"{stem}.{column}.npy" for column in columns ]
+        os.makedirs( self.root, exist_ok=True )
+        for i, f in enumerate( files ):
+            path = os.path.join( self.root, f )
+            with open( path + ".tmp", "wb" ) as out:
+                np.save( out, np.ascontiguousarray( array[:,i] ) )
+            os.replace( path + ".tmp", path )
+
+        entry = {
+            "parser": _parser_name( parser ),
+            "sources": sources,
+            "stat": _stat( sources ),
+            "rows": array.shape[0],
+            "columns": list( columns ),
+            "units": list( units ),
+            "files": files,
+            "attrs": { key: float( value ) for key, value in attrs.items() },
+        }
+        self.manifest["tables"][name] = entry
+        self.mapped.pop( name, None )
+
+        manifest = os.path.join( self.root, "manifest.json" )
+        with open( manifest + ".tmp", "w" ) as f:
+            json.dump( self.manifest, f, indent=1 )
+        os.replace( manifest + ".tmp", manifest )
+        return entry
+
+    def column( self, name, column ):
+        """Read-only memory map of one column of a table."""
+        entry = self.ensure( name )
+        mapped = self.mapped.setdefault( name, {} )
+        if column not in mapped:
+            f = entry["files"][entry["columns"].index( column )]
+            mapped[column] = np.load( os.path.join( self.root, f ), mmap_mode="r" )
+        return mapped[column]
+
+    def load( self, name ):
+        """Whole table as a writeable ( rows, columns ) array."""
+        entry = self.ensure( name )
+        if not entry["columns"]:
+            return np.empty( ( entry["rows"], 0 ) )
+        return np.column_stack( [ self.column( name, column ) for column in entry["columns"] ] )
+
+    def columns( self, name ):
+        return self.ensure( name )["columns"]
+
+    def units( self, name ):
+        return dict( zip( self.ensure( name )["columns"], self.ensure( name )["units"] ) )
+
+    def attrs( self, name ):
+        return self.ensure( name )["attrs"]
+
+
+_default = None
+
+
+def default_store():
+    """The store under ``Feasibility/.datastore`` shared by the analyses."""
+    global _default
+    if _default is None:
+        _default = DataStore()
+    return _default
+
+
+def _loadtxt( sources ):
+    return np.loadtxt( sources[0], ndmin=2 )
+
+
+def loadtxt( filename, store=None ):
+    """``np.loadtxt`` of a whitespace separated table, through the store;
+    the columns are named after ``layouts`` for the extrapolations and data."""
+    store = store or default_store()
+    layout = layouts.get( os.path.basename( os.path.dirname( os.path.abspath( filename ) ) ), ( None, None ) )
+    name = store.add_file( filename, _loadtxt, *layout )
+    return store.load( name )
@@ -0,0 +1,118 @@
+"""Yields of targets losing 19F under the beam.
+
+A fraction f of the 19F atoms remains after an accumulated charge Q,
+f = loss(Q), given as a measured loss curve.  The F is assumed to leave
+uniformly through the layer while the host stays, so per original F atom
+the stopping becomes f eps_F + eps_host and
+
+    Y(E, f) = f int_{E - delta_e(f)}^{E} sigma(E') / (f eps_F(E') + eps_host(E')) dE'
+
+with the energy thickness delta_e(f) shrinking in the same proportion as
+the stopping.  A ``YieldEngine`` with the stopping f eps_F + eps_host is
+built once for each fraction of a grid, and the yield at any fraction is
+interpolated linearly between the two engines around it, so each time step
+of a run is a lookup in their cumulative tables, for all channels, beam
+energies and currents at once.
+"""
+
+import numpy as np
+
+from scan import LabeledArray
+from yields import M0, M1, YieldEngine, q_c
+
+
+class DegradingTarget:
+    """Target whose 19F content follows a loss curve.
+
+    ``fluorine`` is the stopping of the beam in F and ``host`` the stopping
+    of the rest of the target per F atom of the fresh target (e.g. half of
+    H_in_Ca for CaF2), both in eV / (1e15 atoms/cm2) as callables of the
+    lab energy in keV.  ``loss`` gives the remaining fraction of 19F as a
+    function of the charge in C, as a callable or a two column (charge,
+    fraction) table.  ``delta_e`` is the energy thickness of the fresh
+    target in keV.
+    """
+
+    def __init__( self, fluorine, host, channels, loss, names=None, delta_e=20.0, nfractions=21,
+                  emin=0.0, emax=1000.0, step=0.05, M0=M0, M1=M1 ):
+        self.delta_e = delta_e
+
+        if callable( loss ):
+            self.loss = loss
+        else:
+            table = np.asarray( loss, dtype=float )
+            self.loss = lambda charge: np.interp( charge, table[:,0], table[:,1] )
+
+        self.grid = np.linspace( emin, emax, int( round( ( emax - emin ) / step ) ) + 1 )
+        self.eps_f = np.asarray( fluorine( self.grid ), dtype=float )
+        self.eps_host = np.asarray( host( self.grid ), dtype=float )
+
+        # one engine per fraction, all on the same grid
+        self.fractions = np.linspace( 0.0, 1.0, nfractions )
+        self.engines = [ YieldEngine( np.column_stack( ( self.grid, f * self.eps_f + self.eps_host ) ), channels,
+                                      names, grid=self.grid, M0=M0, M1=M1 )
+                         for f in self.fractions ]
+        self.names = self.engines[0].names
+
+    def index( self, name ):
+        return self.names.index( name )
+
+    def _yield_between( self, low, high, fraction ):
+        # linear in fraction between the engines around it, shape (nchannels,) + broadcast shape
+        low, high, fraction = np.broadcast_arrays( low, high, fraction )
+        y = np.clip( fraction, 0, 1 ) * ( len( self.fractions ) - 1 )
+        k = np.minimum( y.astype( int ), len( self.fractions ) - 2 )
+        v = y - k
+
+        # only the engines bracketing a fraction in use are looked up
+        result = np.zeros( ( len( self.names ), ) + low.shape )
+        for j in np.union1d( k, k + 1 ):
+            weight = np.where( k == j, 1 - v, 0.0 ) + np.where( k + 1 == j, v, 0.0 )
+            result += weight * self.engines[j].yield_between( low, high )
+        return result
+
+    def thickness( self, energy, fraction ):
+        """Energy thickness (keV) at a beam energy when a fraction of F remains."""
+        eps_f = np.interp( energy, self.grid, self.eps_f )
+        eps_host = np.interp( energy, self.grid, self.eps_host )
+        return self.delta_e * ( fraction * eps_f + eps_host ) / ( eps_f + eps_host )
+
+    def __call__( self, energy, fraction=1.0 ):
+        """Yield of every channel, shape (nchannels,) + broadcast shape."""
+        energy = np.asarray( energy, dtype=float )
+        fraction = np.asarray( fraction, dtype=float )
+        bottom = energy - self.thickness( energy, fraction )
+        return fraction * self._yield_between( bottom, energy, fraction )
+
+    def run( self, energy, current, hours, step=0.5, efficiency=1.0, charge=0.0 ):
+        """Step a run of ``hours`` at constant current.
+
+        ``energy`` (keV) and ``current`` (A) may be lists of scenarios;
+        ``charge`` is what the target already took.  The F fraction of each
+        step is taken at its midpoint charge.  Returns a dict of
+        ``LabeledArray``: ``fraction`` (current, time), ``rate`` in events
+        per hour and cumulative ``counts`` (channel, energy, current, time),
+        with time the end of each step in hours.
+        """
+        energy = np.atleast_1d( np.asarray( energy, dtype=float ) )
+        current = np.atleast_1d( np.asarray( current, dtype=float ) )
+        nsteps = max( int( np.ceil( hours / step ) ), 1 )
+        time = np.linspace( 0.0, hours, nsteps + 1 )
+        dt = np.diff( time )
+
+        # (current, step)
+        midpoint = charge + current[:,None] * 3600 * 0.5 * ( time[1:] + time[:-1] )
+        fraction = np.asarray( self.loss( midpoint ), dtype=float )
+
+        # (channel, energy, current, step)
+        Y = self( energy[:,None,None], fraction[None,:,:] )
+        rate = Y * ( current[:,None] / q_c * efficiency * 3600 )
+        counts = np.cumsum( rate * dt, axis=-1 )
+
+        coords = { "channel": np.array( self.names ), "energy": energy, "current": current,
+                   "time": time[1:] }
+        dims = ( "channel", "energy", "current", "time" )
+        end = charge + current[:,None] * 3600 * time[1:]
+        return { "fraction": LabeledArray( self.loss( end ), ( "current", "time" ), coords, "fraction", "" ),
+                 "rate": LabeledArray( rate, dims, coords, "rate", "events/h" ),
+                 "counts": LabeledArray( counts, dims, coords, "counts", "events" ) }
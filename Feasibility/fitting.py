@@ -0,0 +1,219 @@
+"""Fits of measured excitation functions with analytic gradients.
+
+The model of a yield curve is
+
+    Y(E) = norm * [ Y_ext(E + offset, delta_e)
+                    + sum_r (lambda_r^2 / 2) (M0 + M1) / M1 * wg_r / eps(E_r) * P_r(E) ]
+
+with Y_ext the yield of an extrapolation table from a ``YieldEngine``, and
+narrow resonances of strength wg_r (eV) at lab energy E_r (keV) and lab
+width Gamma_r, whose thick-target profile is
+
+    P_r(E) = [ atan((E + offset - E_r) / (Gamma_r / 2))
+               - atan((E + offset - delta_e - E_r) / (Gamma_r / 2)) ] / pi
+
+The stopping and the cumulative sigma / epsilon tables come from the
+engine and are computed once, so each iteration costs a few interpolations
+per energy.  The derivatives with respect to all the parameters are those of
+the model as computed, with the slope of each table taken on the interval
+of its linear interpolation, so they agree with finite differences to
+rounding.
+"""
+
+import numpy as np
+from scipy.optimize import OptimizeResult, least_squares, minimize
+
+from yields import barn_to_cm2, lab_to_cm
+
+hbarc = 197.3269804 # MeV fm
+amu = 931.49410242  # MeV
+fm2_to_cm2 = 1e-26
+
+
+class YieldModel:
+    """Yield curve of one channel of ``engine`` plus narrow resonances.
+
+    ``channel`` names the extrapolation of the engine used as the smooth
+    part (None for resonances only, e.g. when the table already holds
+    them); ``resonances`` is a list of (E_r [keV], wg [eV], Gamma [keV])
+    in the lab.  The parameters are ``norm``, ``delta_e`` (target
+    thickness in keV), ``offset`` (beam energy offset in keV), then
+    ``wg0``, ``wg1``, ... and ``E_r0``, ``E_r1``, ...; the widths are fixed.
+    """
+
+    def __init__( self, engine, channel=None, resonances=(), norm=1.0, delta_e=20.0, offset=0.0 ):
+        self.engine = engine
+        self.M0 = engine.M0
+        self.M1 = engine.M1
+
+        # cached per grid node: the cumulative yield and the stopping
+        if channel is None:
+            self.cumulative = np.zeros_like( engine.grid )
+        else:
+            self.cumulative = engine.cumulative[engine.index( channel )]
+        self.stopping = barn_to_cm2 * 1e15 * 1e3 / engine.weight * 1e-15 # eV cm^2
+
+        # and the slopes of their linear interpolation on each interval
+        self.dcumulative = np.diff( self.cumulative ) / np.diff( engine.grid )
+        self.dstopping = np.diff( self.stopping ) / np.diff( engine.grid )
+
+        resonances = np.array( resonances, dtype=float ).reshape( -1, 3 )
+        self.width = resonances[:,2]
+        nres = len( resonances )
+        self.names = ( [ "norm", "delta_e", "offset" ] + [ f"wg{r}" for r in range( nres ) ]
+                       + [ f"E_r{r}" for r in range( nres ) ] )
+        self.initial = np.concatenate( ( [ norm, delta_e, offset ], resonances[:,1], resonances[:,0] ) )
+
+    @property
+    def nresonances( self ):
+        return len( self.width )
+
+    def _interp( self, table, energy ):
+        return np.interp( energy, self.engine.grid, table )
+
+    def _slope( self, slopes, energy ):
+        # derivative of _interp: the slope of the interval, 0 beyond the grid
+        grid = self.engine.grid
+        i = np.clip( np.searchsorted( grid, energy, side="right" ) - 1, 0, len( grid ) - 2 )
+        return np.where( ( energy < grid[0] ) | ( energy > grid[-1] ), 0.0, slopes[i] )
+
+    def _lambda2( self, energy ):
+        # lambda^2 / 2 in cm^2 at a lab energy in keV
+        energy_cm = lab_to_cm( energy, self.M0, self.M1 ) / 1e3
+        mu = self.M0 * self.M1 / ( self.M0 + self.M1 ) * amu
+        return 0.5 * ( 2 * np.pi * hbarc )**2 / ( 2 * mu * energy_cm ) * fm2_to_cm2
+
+    def __call__( self, params, energy ):
+        return self.evaluate( params, energy, gradient=False )
+
+    def evaluate( self, params, energy, gradient=True ):
+        """Yield per beam particle at the lab energies ``energy`` (keV) and,
+        with ``gradient``, its derivatives, shape (len(energy), nparams)."""
+        energy = np.asarray( energy, dtype=float )
+        n = self.nresonances
+        norm, delta_e, offset = params[:3]
+        strength, E_r = params[3:3 + n], params[3 + n:]
+
+        top = energy + offset
+        bottom = top - delta_e
+        smooth = self._interp( self.cumulative, top ) - self._interp( self.cumulative, bottom )
+
+        # resonance terms, shape (nenergies, nresonances)
+        half = 0.5 * self.width
+        a = ( top[:,None] - E_r ) / half
+        b = ( bottom[:,None] - E_r ) / half
+        profile = ( np.arctan( a ) - np.arctan( b ) ) / np.pi
+        eps = self._interp( self.stopping, E_r )
+        amplitude = self._lambda2( E_r ) * ( self.M0 + self.M1 ) / self.M1 / eps
+        resonant = profile @ ( amplitude * strength )
+
+        total = smooth + resonant
+        if not gradient:
+            return norm * total
+
+        da = 1 / ( np.pi * half * ( 1 + a**2 ) )
+        db = 1 / ( np.pi * half * ( 1 + b**2 ) )
+        term = amplitude * strength
+
+        jac = np.empty( ( len( energy ), len( params ) ) )
+        jac[:,0] = total
+        jac[:,1] = norm * ( self._slope( self.dcumulative, bottom ) + db @ term )
+        jac[:,2] = norm * ( self._slope( self.dcumulative, top ) - self._slope( self.dcumulative, bottom )
+                            + ( da - db ) @ term )
+        jac[:,3:3 + n] = norm * profile * amplitude
+        # lambda^2 goes as 1 / E_r and the stopping is taken at E_r
+        damplitude = amplitude * ( -1 / E_r - self._slope( self.dstopping, E_r ) / eps )
+        jac[:,3 + n:] = norm * strength * ( profile * damplitude - ( da - db ) * amplitude )
+        return norm * total, jac
+
+
+def _free( model, fixed ):
+    free = np.array( [ name not in fixed for name in model.names ] )
+    if not free.any():
+        raise ValueError( "all the parameters are fixed" )
+    return free
+
+
+def _result( model, params, free, covariance, **info ):
+    errors = np.zeros( len( params ) )
+    errors[free] = np.sqrt( np.maximum( np.diag( covariance ), 0 ) )
+    return OptimizeResult( x=params, names=model.names, covariance=covariance,
+                           parameters=dict( zip( model.names, params ) ),
+                           errors=dict( zip( model.names, errors ) ), **info )
+
+
+def fit_least_squares( model, energy, yields, errors, x0=None, fixed=(), bounds=None, **options ):
+    """Chi-square fit of measured yields with their 1 sigma errors.
+
+    ``fixed`` names the parameters kept at their ``x0`` (by default the
+    model's initial) values; ``bounds`` is a (lower, upper) pair over the
+    free parameters.  Extra options go to ``scipy.optimize.least_squares``.
+    Returns an OptimizeResult with the parameters, their covariance and
+    errors, and the chi-square.
+    """
+    params = np.array( model.initial if x0 is None else x0, dtype=float )
+    free = _free( model, fixed )
+    energy = np.asarray( energy, dtype=float )
+    yields = np.asarray( yields, dtype=float )
+    errors = np.asarray( errors, dtype=float )
+
+    def residuals( x ):
+        params[free] = x
+        return ( model( params, energy ) - yields ) / errors
+
+    def jacobian( x ):
+        params[free] = x
+        return model.evaluate( params, energy )[1][:,free] / errors[:,None]
+
+    sol = least_squares( residuals, params[free], jac=jacobian,
+                         bounds=bounds if bounds is not None else ( -np.inf, np.inf ), **options )
+    params[free] = sol.x
+    J = sol.jac
+    covariance = np.linalg.pinv( J.T @ J )
+    chi2 = float( np.sum( sol.fun**2 ) )
+    return _result( model, params, free, covariance, chi2=chi2, ndf=len( energy ) - int( free.sum() ),
+                    success=sol.success, message=sol.message, nfev=sol.nfev, njev=sol.njev )
+
+
+def fit_poisson( model, energy, counts, particles, efficiency=1.0, x0=None, fixed=(), bounds=None,
+                 **options ):
+    """Maximum likelihood fit of event counts.
+
+    The expected counts at each energy are yield * particles * efficiency,
+    with ``particles`` the number of beam particles (charge / q_c).  Half
+    the Poisson deviance (the negative log-likelihood up to a constant) and
+    its gradient are minimized with L-BFGS-B, in parameters scaled by their
+    starting values; ``bounds`` is a list of (lower, upper) per free
+    parameter.  The covariance is the inverse Fisher information.
+    """
+    params = np.array( model.initial if x0 is None else x0, dtype=float )
+    free = _free( model, fixed )
+    energy = np.asarray( energy, dtype=float )
+    counts = np.asarray( counts, dtype=float )
+    exposure = np.broadcast_to( np.asarray( particles, dtype=float ) * efficiency, energy.shape )
+    tiny = np.finfo( float ).tiny
+
+    scale = np.where( params[free] != 0, np.abs( params[free] ), 1.0 )
+    saturated = counts * np.log( np.maximum( counts, 1 ) ) - counts
+
+    def deviance( x ):
+        params[free] = x * scale
+        Y, J = model.evaluate( params, energy )
+        expected = np.maximum( Y * exposure, tiny )
+        value = np.sum( expected - counts * np.log( expected ) + saturated )
+        grad = ( ( 1 - counts / expected ) * exposure ) @ J[:,free] * scale
+        return value, grad
+
+    if bounds is not None:
+        bounds = [ ( None if lo is None else lo / s, None if hi is None else hi / s )
+                   for ( lo, hi ), s in zip( bounds, scale ) ]
+    sol = minimize( deviance, params[free] / scale, jac=True, method="L-BFGS-B", bounds=bounds, **options )
+    params[free] = sol.x * scale
+
+    Y, J = model.evaluate( params, energy )
+    expected = np.maximum( Y * exposure, tiny )
+    dmu = J[:,free] * exposure[:,None]
+    covariance = np.linalg.pinv( dmu.T @ ( dmu / expected[:,None] ) )
+    return _result( model, params, free, covariance, deviance=2 * float( sol.fun ),
+                    ndf=len( energy ) - int( free.sum() ),
+                    success=sol.success, message=sol.message, nfev=sol.nfev )
@@ -0,0 +1,114 @@
+"""Yields of implanted 19F targets from SRIM final ion positions.
+
+The RANGE_3D files in ``Implanted Target/SRIM/out`` hold the depth of each
+implanted F ion in Fe.  They are histogrammed into a F areal density per
+depth bin, the beam energy at every bin is found from the H-in-Fe range
+(energy) relation, and the yield is the sum over bins of the F atoms times
+the cross section there.  Everything is vectorized over channels, beam
+energies and depth bins.
+"""
+
+import glob
+import os
+import re
+
+import numpy as np
+
+from datastore import default_store
+from yields import M0, M1, barn_to_cm2, lab_to_cm
+
+range_dir = os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), "..", "Implanted Target", "SRIM", "out" )
+
+
+def parse_depths( sources ):
+    """Depths (Angstrom) of the ions in a SRIM RANGE_3D file, the one source of its store table."""
+    with open( sources[0], encoding="ISO-8859-1" ) as f:
+        text = f.read()
+
+    # the table follows the dashed line under the column header
+    table = text[re.search( r"^-+\s+-+\s+-+\s+-+\s*$", text, re.M ).end():]
+    return np.array( table.split(), dtype=float ).reshape( -1, 4 )[:,1]
+
+
+def read_depths( filename, store=None ):
+    """Depths (Angstrom) of the ions in a SRIM RANGE_3D file, parsed once
+    and then memory mapped from the data store."""
+    store = store or default_store()
+    name = store.add_file( filename, parse_depths, [ "depth" ], [ "A" ] )
+    return store.column( name, "depth" )
+
+
+def implantation_energy( filename ):
+    """Implantation energy in keV from a RANGE_<ion>_IN_<target>_ENERGY_<E>KEV_<n>.txt name."""
+    return float( re.search( r"ENERGY_([\d.]+)KEV", os.path.basename( filename ) ).group( 1 ) )
+
+
+def depth_profiles( pattern=os.path.join( range_dir, "RANGE_F_IN_FE_ENERGY_*KEV_*.txt" ),
+                    bin_width=10.0, max_depth=None ):
+    """Normalized depth histograms of each implantation energy.
+
+    Returns the bin edges (Angstrom) and a dict energy -> fraction of the
+    ions in each bin.
+    """
+    depths = {}
+    for filename in sorted( glob.glob( pattern ) ):
+        depths.setdefault( implantation_energy( filename ), [] ).append( read_depths( filename ) )
+    if not depths:
+        raise FileNotFoundError( f"no RANGE_3D files match {pattern}" )
+    depths = { energy: np.concatenate( d ) for energy, d in depths.items() }
+
+    if max_depth is None:
+        max_depth = max( d.max() for d in depths.values() )
+    edges = np.arange( 0.0, max_depth + bin_width, bin_width )
+
+    profiles = { energy: np.histogram( d, bins=edges )[0] / len( d ) for energy, d in depths.items() }
+    return edges, profiles
+
+
+class ImplantedTarget:
+    """F implanted in a host, with the beam slowed down by the host.
+
+    ``fluence`` maps each implantation energy (keV) to the F ions per cm2
+    implanted at that energy; the profiles come from ``depth_profiles``.
+    ``stopping`` is the SRIM table of the beam in the host (e.g. H_in_Fe),
+    whose target density converts the stopping to keV/Angstrom.  The F
+    itself is assumed too dilute to change the stopping.
+    """
+
+    def __init__( self, stopping, fluence, pattern=None, bin_width=10.0, emax=1000.0, step=0.05,
+                  M0=M0, M1=M1 ):
+        edges, profiles = depth_profiles( pattern, bin_width ) if pattern else depth_profiles( bin_width=bin_width )
+        self.edges = edges
+        self.depth = 0.5 * ( edges[1:] + edges[:-1] )
+
+        # F atoms/cm2 in each depth bin
+        self.areal_density = sum( fluence[energy] * profiles[energy] for energy in fluence )
+        self.M0 = M0
+        self.M1 = M1
+
+        # range-energy relation R(E) = int dE / S(E) of the beam in the host
+        self.energy = np.arange( 0.0, emax + step, step )
+        self.energy[0] = step / 2
+        stop = stopping.eval( self.energy ) * stopping.get_density() * 1e-15 * 1e-8 * 1e-3 # keV / A
+        self.range = np.concatenate( ( [ 0.0 ], np.cumsum( 0.5 * step * ( 1 / stop[1:] + 1 / stop[:-1] ) ) ) )
+
+    def beam_energy( self, energy ):
+        """Mean beam energy (keV) at each depth bin, shape energy.shape + (nbins,)."""
+        energy = np.asarray( energy, dtype=float )
+        residual = np.interp( energy, self.energy, self.range )[...,None] - self.depth
+        # beam stopped before reaching the bin
+        return np.where( residual > 0, np.interp( residual, self.range, self.energy ), 0.0 )
+
+    def __call__( self, energy, channels ):
+        """Yield per beam particle of every channel, shape (nchannels,) + energy.shape.
+
+        ``channels`` is a list (or dict) of extrapolation tables, center-of-mass
+        energy in MeV in the first column and cross section in barn in the fourth.
+        """
+        if isinstance( channels, dict ):
+            channels = list( channels.values() )
+
+        energy_cm = lab_to_cm( self.beam_energy( energy ), self.M0, self.M1 ) / 1e3
+        cross = np.array( [ np.where( energy_cm > 0, np.interp( energy_cm, table[:,0], table[:,3] ), 0.0 )
+                            for table in channels ] )
+        return barn_to_cm2 * np.sum( cross * self.areal_density, axis=-1 )
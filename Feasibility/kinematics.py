@@ -0,0 +1,94 @@
+"""Compiled kinematics and S-factor conversions.
+
+The functions are numba ufuncs: they broadcast over arrays of any shape,
+accept ``out=`` to write in place, and take the reaction constants as
+arguments.  ``Reaction`` precomputes those constants once per reaction.
+Energies are in MeV wherever the Sommerfeld parameter is involved.
+"""
+
+import numba
+import numpy as np
+from numba import float64
+
+M0 = 1.0078250 # amu projectile
+M1 = 18.998403 # amu target
+
+# 2 pi eta = sommerfeld_const * Z0 Z1 sqrt(mu [amu] / E_cm [MeV])
+sommerfeld_const = 0.989534
+
+
+@numba.vectorize([float64(float64, float64, float64)], cache=True)
+def lab_to_cm( energy_lab, M0, M1 ):
+    return energy_lab * M1 / ( M1 + M0 )
+
+
+@numba.vectorize([float64(float64, float64, float64)], cache=True)
+def cm_to_lab( energy_cm, M0, M1 ):
+    return energy_cm * ( M1 + M0 ) / M1
+
+
+@numba.vectorize([float64(float64, float64)], cache=True)
+def two_pi_eta( energy_cm, eta_const ):
+    """2 pi times the Sommerfeld parameter, eta_const = 0.989534 Z0 Z1 sqrt(mu)."""
+    return eta_const / np.sqrt( energy_cm )
+
+
+@numba.vectorize([float64(float64, float64, float64)], cache=True)
+def sigma_to_s( cross_section, energy_cm, eta_const ):
+    return cross_section * energy_cm * np.exp( eta_const / np.sqrt( energy_cm ) )
+
+
+@numba.vectorize([float64(float64, float64, float64)], cache=True)
+def s_to_sigma( s_factor, energy_cm, eta_const ):
+    return s_factor / energy_cm * np.exp( -eta_const / np.sqrt( energy_cm ) )
+
+
+@numba.vectorize([float64(float64, float64, float64)], cache=True)
+def screening_factor( energy_cm, eta_const, potential ):
+    """Electron-screening enhancement exp(pi eta U_e / E), U_e in MeV."""
+    return np.exp( 0.5 * eta_const / np.sqrt( energy_cm ) * potential / energy_cm )
+
+
+class Reaction:
+    """Constants of a two-body reaction, e.g. Reaction(1.0078250, 18.998403, 1, 9) for 19F+p.
+
+    ``potential`` is the electron-screening potential U_e in MeV; with it
+    ``bare_s_factor`` and ``screened_cross_section`` remove or include the
+    enhancement.
+    """
+
+    def __init__( self, M0=M0, M1=M1, Z0=1, Z1=9, potential=0.0 ):
+        self.M0 = float( M0 )
+        self.M1 = float( M1 )
+        self.Z0 = Z0
+        self.Z1 = Z1
+        self.mu = self.M0 * self.M1 / ( self.M0 + self.M1 )
+        self.eta_const = sommerfeld_const * Z0 * Z1 * np.sqrt( self.mu )
+        self.potential = float( potential )
+
+    def lab_to_cm( self, energy_lab, out=None ):
+        return lab_to_cm( energy_lab, self.M0, self.M1, out=out )
+
+    def cm_to_lab( self, energy_cm, out=None ):
+        return cm_to_lab( energy_cm, self.M0, self.M1, out=out )
+
+    def two_pi_eta( self, energy_cm, out=None ):
+        return two_pi_eta( energy_cm, self.eta_const, out=out )
+
+    def s_factor( self, cross_section, energy_cm, out=None ):
+        return sigma_to_s( cross_section, energy_cm, self.eta_const, out=out )
+
+    def cross_section( self, s_factor, energy_cm, out=None ):
+        return s_to_sigma( s_factor, energy_cm, self.eta_const, out=out )
+
+    def screening( self, energy_cm, potential=None, out=None ):
+        potential = self.potential if potential is None else potential
+        return screening_factor( energy_cm, self.eta_const, potential, out=out )
+
+    def bare_s_factor( self, cross_section, energy_cm, potential=None ):
+        """S-factor of a measured (screened) cross section with the screening removed."""
+        return self.s_factor( cross_section, energy_cm ) / self.screening( energy_cm, potential )
+
+    def screened_cross_section( self, s_factor, energy_cm, potential=None ):
+        """Cross section a screened target shows for a bare S-factor."""
+        return self.cross_section( s_factor, energy_cm ) * self.screening( energy_cm, potential )
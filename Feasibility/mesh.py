@@ -0,0 +1,116 @@
+"""Adaptive energy meshes that refine around narrow resonances.
+
+``refine`` bisects the intervals of a grid where the value at the midpoint
+differs from the linear interpolation of the endpoints, i.e. where the
+curvature is large, so points gather on the resonances and stay sparse
+elsewhere.  Only the midpoints of the intervals still being refined are
+evaluated, all at once, and every evaluated point is kept.
+
+On top of it ``AdaptiveYield`` is a ``YieldEngine`` on a mesh refined on
+sigma / epsilon, and ``yield_grid`` returns non-uniform beam energies
+following the structure of a yield curve, for plots and run planning.
+"""
+
+import numpy as np
+
+from yields import M0, M1, YieldEngine, barn_to_cm2, cm_to_lab, lab_to_cm
+
+
+def refine( func, grid, rtol=1e-3, atol=0.0, min_step=1e-3, max_points=100000 ):
+    """Refine ``grid`` until ``func`` is linear to within tolerance on it.
+
+    ``func`` maps an array of n energies to an array of shape (..., n), e.g.
+    one row per channel; an interval is split while any row misses by more
+    than atol + rtol * |f| at its midpoint.  The tolerance is relative to
+    the local value, so the steep sub-barrier tails are resolved as well as
+    the resonances.  Intervals shorter than ``min_step`` are not split.
+    Returns the grid and the values on it.
+    """
+    x = np.unique( np.asarray( grid, dtype=float ) )
+    y = np.asarray( func( x ), dtype=float )
+    active = np.ones( len( x ) - 1, dtype=bool )
+
+    while active.any() and len( x ) < max_points:
+        i = np.flatnonzero( active )
+        mid = 0.5 * ( x[i] + x[i + 1] )
+        ym = np.asarray( func( mid ), dtype=float )
+        linear = 0.5 * ( y[...,i] + y[...,i + 1] )
+
+        miss = np.abs( ym - linear ) > atol + rtol * np.abs( ym )
+        miss = miss.reshape( -1, len( i ) ).any( axis=0 ) & ( x[i + 1] - x[i] > 2 * min_step )
+
+        # a split interval gives two children, refined further if it missed
+        children = np.where( active, 1, 0 ) + 1
+        flags = np.zeros( len( active ), dtype=bool )
+        flags[i] = miss
+        active = np.repeat( flags, children )
+
+        x = np.insert( x, i + 1, mid )
+        y = np.insert( y, i + 1, ym, axis=-1 )
+
+    return x, y
+
+
+def cross_sections( channels, energy, M0=M0, M1=M1 ):
+    """Cross sections (barn) of every channel at lab energies in keV."""
+    energy_cm = lab_to_cm( np.asarray( energy, dtype=float ), M0, M1 ) / 1e3
+    return np.array( [ np.interp( energy_cm, table[:,0], table[:,3] ) for table in channels ] )
+
+
+def resonances( channels, emin, emax, M0=M0, M1=M1 ):
+    """Lab energies (keV) of the local maxima of the tabulated cross sections."""
+    peaks = []
+    for table in channels:
+        sigma = table[:,3]
+        i = np.flatnonzero( ( sigma[1:-1] > sigma[:-2] ) & ( sigma[1:-1] >= sigma[2:] ) ) + 1
+        peaks.append( cm_to_lab( table[i,0] * 1e3, M0, M1 ) )
+    peaks = np.concatenate( peaks ) if peaks else np.zeros( 0 )
+    return np.unique( peaks[( peaks > emin ) & ( peaks < emax )] )
+
+
+class AdaptiveYield( YieldEngine ):
+    """``YieldEngine`` on a resonance-aware mesh.
+
+    Takes the same ``stopping`` and ``channels``, but the cumulative
+    integral of sigma / epsilon is built on a mesh that starts from
+    ``npoints`` uniform nodes plus the peaks of the tables and is refined
+    where the integrand curves, so the same accuracy costs far fewer
+    cross-section evaluations than a uniform fine grid.
+    """
+
+    def __init__( self, stopping, channels=(), names=None, emin=10.0, emax=1000.0, npoints=65,
+                  rtol=1e-3, min_step=1e-3, M0=M0, M1=M1 ):
+        if isinstance( channels, dict ):
+            names, channels = list( channels ), list( channels.values() )
+        self.channels = list( channels )
+
+        if not callable( stopping ):
+            table = stopping
+            stopping = lambda energy: np.interp( energy, table[:,0], table[:,1] )
+
+        def integrand( energy ):
+            weight = barn_to_cm2 / np.asarray( stopping( energy ), dtype=float ) * 1e15 * 1e3
+            return cross_sections( self.channels, energy, M0, M1 ) * weight
+
+        seeds = np.concatenate( ( np.linspace( emin, emax, npoints ),
+                                  resonances( self.channels, emin, emax, M0, M1 ) ) )
+        grid, _ = refine( integrand, seeds, rtol=rtol, min_step=min_step )
+        super().__init__( stopping, self.channels, names, M0=M0, M1=M1, grid=grid )
+
+    @property
+    def evaluations( self ):
+        """Number of energies at which the cross sections were evaluated."""
+        return len( self.grid )
+
+
+def yield_grid( engine, emin, emax, delta_e, npoints=33, rtol=1e-2, min_step=0.1 ):
+    """Non-uniform beam energies (keV) resolving the yield curves of ``engine``.
+
+    ``engine`` is a ``YieldEngine`` or ``AdaptiveYield``; the energies are
+    refined until every channel's yield is linear between neighbours to
+    ``rtol``, never closer than ``min_step``.  Returns the energies and the yields there.
+    """
+    seeds = np.linspace( emin, emax, npoints )
+    if hasattr( engine, "channels" ):
+        seeds = np.concatenate( ( seeds, resonances( engine.channels, emin, emax, engine.M0, engine.M1 ) ) )
+    return refine( lambda energy: engine( energy, delta_e ), seeds, rtol=rtol, min_step=min_step )
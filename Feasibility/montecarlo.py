@@ -0,0 +1,155 @@
+"""Monte Carlo propagation of the input uncertainties to the feasibility rates.
+
+Each sample scales
+
+- the cross section of each channel by exp(z_c(E) ln(1 + u_c(E))), with
+  u_c the relative S-factor uncertainty (a constant, a function of the
+  beam energy, or one read from the error columns of a data set with
+  ``data_uncertainty``); z_c is fully correlated in energy and correlated
+  between channels by ``channel_correlation``;
+- the stopping of the target by one lognormal factor s of width
+  ``stopping_uncertainty`` (SRIM quotes a few percent); for a target of
+  fixed areal density this scales sigma / epsilon by 1 / s and the energy
+  thickness delta_e by s;
+- the efficiency of each channel by a lognormal factor, correlated
+  between channels by ``efficiency_correlation``.
+
+The cross-section factors vary with energy, so the yield of a target is
+split into the contributions of ``bin_width`` keV energy bins, from the
+cumulative tables of the ``YieldEngine``; a batch of samples is then one
+matrix product of the per-bin factors with those contributions, and the
+yields, count rates and beam times of thousands of samples come out of a
+few array operations.  The thickness of a sample differs from the nominal
+one by a slab at the bottom of the target, whose yield comes from the
+cumulative tables as well and takes the factors of the bin holding the
+nominal bottom.
+"""
+
+import warnings
+
+import numpy as np
+
+from scan import LabeledArray
+from yields import q_c
+
+
+def data_uncertainty( data, floor=0.0 ):
+    """Relative uncertainty of a data set as a function of the lab energy
+    in keV, from its lab energy (MeV), cross section and error columns
+    (0, 2 and 3, as JUNA_pg1.dat and Couture_pg1.dat); constant beyond
+    the measured range."""
+    data = np.asarray( data, dtype=float )
+    order = np.argsort( data[:,0] )
+    energy = data[order,0] * 1e3
+    relative = np.maximum( data[order,3] / data[order,2], floor )
+    return lambda e: np.interp( e, energy, relative )
+
+
+def _correlated( rng, n, size, rho ):
+    # standard normals of dimension size with a constant correlation 0 <= rho <= 1
+    common = rng.standard_normal( ( n, 1 ) )
+    return np.sqrt( rho ) * common + np.sqrt( 1 - rho ) * rng.standard_normal( ( n, size ) )
+
+
+class MonteCarlo:
+    """Sampler of the yields of one target.
+
+    ``s_uncertainty`` and ``efficiency_uncertainty`` are scalars or one
+    value per channel of ``engine``; an S-factor uncertainty may also be a
+    callable of the lab energy in keV (see ``data_uncertainty``).
+    """
+
+    def __init__( self, engine, s_uncertainty=0.0, stopping_uncertainty=0.0, efficiency_uncertainty=0.0,
+                  channel_correlation=0.0, efficiency_correlation=1.0, bin_width=5.0, seed=None ):
+        self.engine = engine
+        self.nchannels = len( engine.names )
+        self.stopping_uncertainty = stopping_uncertainty
+        self.channel_correlation = channel_correlation
+        self.efficiency_correlation = efficiency_correlation
+        self.rng = np.random.default_rng( seed )
+
+        if callable( s_uncertainty ) or np.ndim( s_uncertainty ) == 0:
+            s_uncertainty = [ s_uncertainty ] * self.nchannels
+        self.efficiency_uncertainty = np.broadcast_to(
+            np.asarray( efficiency_uncertainty, dtype=float ), self.nchannels )
+
+        # bins over the engine grid, with the log factor of each channel at their centers
+        self.edges = np.arange( engine.grid[0], engine.grid[-1] + bin_width, bin_width )
+        self.edges[-1] = min( self.edges[-1], engine.grid[-1] )
+        centers = 0.5 * ( self.edges[1:] + self.edges[:-1] )
+        self.log_factor = np.array( [ np.log1p( u( centers ) if callable( u ) else np.full( len( centers ), u ) )
+                                      for u in s_uncertainty ] )
+
+    def contributions( self, energy, delta_e ):
+        """Yield of each channel coming from each energy bin, shape
+        (nchannels, nenergies, nbins); summed over the bins it is the
+        engine's yield."""
+        energy = np.atleast_1d( np.asarray( energy, dtype=float ) )
+        top = np.minimum( energy[:,None], self.edges[1:] )
+        bottom = np.maximum( energy[:,None] - delta_e, self.edges[:-1] )
+        inside = top > bottom
+        return np.where( inside, self.engine.yield_between( bottom, top ), 0.0 )
+
+    def sample_yields( self, energy, delta_e, nsamples=4000, batch=1000 ):
+        """Sampled yields, shape (nsamples, nchannels, nenergies), and the
+        sampled efficiency factors, shape (nsamples, nchannels)."""
+        energy = np.atleast_1d( np.asarray( energy, dtype=float ) )
+        parts = self.contributions( energy, delta_e )
+        yields = np.empty( ( nsamples, self.nchannels, parts.shape[1] ) )
+        efficiency = np.empty( ( nsamples, self.nchannels ) )
+
+        # bin of the nominal bottom of the target, whose factors the slab takes
+        bottom = energy - delta_e
+        edge = np.clip( np.searchsorted( self.edges, bottom, side="right" ) - 1, 0, len( self.edges ) - 2 )
+
+        for start in range( 0, nsamples, batch ):
+            n = min( batch, nsamples - start )
+            z = _correlated( self.rng, n, self.nchannels, self.channel_correlation )
+            factors = np.exp( z[:,:,None] * self.log_factor[None,:,:] )
+            stopping = np.exp( self.rng.standard_normal( n ) * np.log1p( self.stopping_uncertainty ) )
+
+            # (channel, n, bin) @ (channel, bin, energy) -> (n, channel, energy)
+            product = np.matmul( factors.transpose( 1, 0, 2 ), parts.transpose( 0, 2, 1 ) ).transpose( 1, 0, 2 )
+
+            # the slab from the nominal bottom down to that of a thickness delta_e * s,
+            # negative for s < 1, shape (n, channel, energy)
+            slab = self.engine.yield_between( bottom - delta_e * ( stopping[:,None] - 1 ), bottom ).transpose( 1, 0, 2 )
+            yields[start:start + n] = ( product + factors[:,:,edge] * slab ) / stopping[:,None,None]
+
+            z = _correlated( self.rng, n, self.nchannels, self.efficiency_correlation )
+            efficiency[start:start + n] = np.exp( z * np.log1p( self.efficiency_uncertainty ) )
+
+        return yields, efficiency
+
+    def propagate( self, energy, delta_e, current, efficiency, nsamples=4000, quantiles=( 0.16, 0.5, 0.84 ),
+                   events=10000, per=3600, batch=1000 ):
+        """Quantile bands of the count rates and of the hours to ``events`` events.
+
+        ``efficiency`` is the nominal efficiency, a scalar or one per
+        channel.  Returns a dict of ``LabeledArray`` with dims (quantile,
+        channel, energy): ``yield``, ``rate`` (events per ``per`` seconds)
+        and ``hours``, and with dims (channel, energy) ``zero_rate``, the
+        fraction of the samples with no events at all.  Those never reach
+        ``events``, so the ``hours`` are the quantiles of the other samples
+        (nan where every sample has a zero rate).
+        """
+        energy = np.atleast_1d( np.asarray( energy, dtype=float ) )
+        Y, factor = self.sample_yields( energy, delta_e, nsamples, batch )
+        efficiency = np.broadcast_to( np.asarray( efficiency, dtype=float ), self.nchannels )
+
+        rate = Y * ( current / q_c * per * efficiency * factor )[:,:,None]
+        zero = rate <= 0
+        with np.errstate( divide="ignore" ):
+            hours = np.where( zero, np.nan, events / ( rate * 3600 / per ) )
+        quantiles = np.asarray( quantiles, dtype=float )
+        with warnings.catch_warnings():
+            # all-nan slices, where every sample has a zero rate
+            warnings.simplefilter( "ignore", RuntimeWarning )
+            hours = np.nanquantile( hours, quantiles, axis=0 )
+
+        coords = { "quantile": quantiles, "channel": np.array( self.engine.names ), "energy": energy }
+        dims = ( "quantile", "channel", "energy" )
+        return { "yield": LabeledArray( np.quantile( Y, quantiles, axis=0 ), dims, coords, "yield", "per particle" ),
+                 "rate": LabeledArray( np.quantile( rate, quantiles, axis=0 ), dims, coords, "rate", f"events/{per} s" ),
+                 "hours": LabeledArray( hours, dims, coords, "hours", "h" ),
+                 "zero_rate": LabeledArray( zero.mean( axis=0 ), dims[1:], coords, "zero rate", "fraction" ) }
@@ -0,0 +1,102 @@
+"""Thermonuclear reaction rates N_A<sigma v> from the S-factor extrapolations.
+
+    N_A<sigma v> = 3.7318e10 mu^-1/2 T9^-3/2 int S(E) exp(-2 pi eta - 11.6045 E / T9) dE
+
+in cm^3 / mol / s, with E in MeV and S in MeV b.  The S-factor is
+interpolated linearly in the tables rather than the cross section, since it
+is smooth where the cross section spans tens of orders of magnitude, and
+below the tables it is held constant.
+
+The integrand is then smooth between two table energies, however narrow the
+resonances in the tables, so the integral is a sum over those intervals of
+Gauss-Legendre quadratures, from 0 to the end of the tables.  Its error is
+that of the quadrature of a smooth function over one table step, below 1e-10
+for the extrapolations here at every temperature of ``T9_grid``.  The
+S-factors at the quadrature nodes do not depend on the temperature, so all
+the channels and temperatures come out of one matrix product.
+
+The tables written by ``write_table`` have T9 and N_A<sigma v> in their
+first two columns, as read by ``ReaclibNetwork.load_table_rate``.
+"""
+
+import numpy as np
+
+from kinematics import Reaction, two_pi_eta
+
+rate_const = 3.7318e10 # N_A sqrt(8 / pi amu) in cm^3/mol/s, MeV, b
+inv_k = 11.6045        # 1 / k_B in GK / MeV
+
+# default temperatures, uniform in ln T9 as the network tables
+T9_grid = np.geomspace( 0.01, 10, 121 )
+
+
+def gamow_window( T9, reaction=Reaction() ):
+    """Gamow peak E0 and its 1/e width Delta, in MeV."""
+    T9 = np.asarray( T9, dtype=float )
+    z2mu = ( reaction.Z0 * reaction.Z1 )**2 * reaction.mu
+    return 0.1220 * ( z2mu * T9**2 )**( 1 / 3 ), 0.2368 * ( z2mu * T9**5 )**( 1 / 6 )
+
+
+def gauss_mesh( channels, order=8 ):
+    """Gauss-Legendre nodes (MeV) and weights over every interval between
+    the energies of the tables, from 0 to the end of the shortest table."""
+    emax = min( table[-1,0] for table in channels )
+    edges = np.unique( np.concatenate( [ [ 0.0, emax ] ] + [ table[:,0] for table in channels ] ) )
+    edges = edges[edges <= emax]
+    x, w = np.polynomial.legendre.leggauss( order )
+    half = 0.5 * np.diff( edges )
+    middle = 0.5 * ( edges[1:] + edges[:-1] )
+    return ( middle[:,None] + half[:,None] * x ).ravel(), ( half[:,None] * w ).ravel()
+
+
+def reaction_rate( channels, T9=T9_grid, reaction=Reaction(), uncertainty=None, order=8 ):
+    """N_A<sigma v> of every channel, shape (nchannels,) + T9.shape.
+
+    ``channels`` is a list (or dict) of extrapolation tables with the
+    center-of-mass energy in MeV in the first column and the S-factor in
+    MeV b in the fifth.  The integral stops at the end of the tables, so at
+    temperatures whose Gamow window runs past it the rates are lower limits
+    (see ``coverage``).  ``order`` is the number of Gauss-Legendre nodes
+    per table interval.
+
+    With ``uncertainty``, the relative 1 sigma uncertainty of the S-factors
+    as a scalar or one value (or one array aligned with the table rows)
+    per channel, returns the rates and their lower and upper bands.
+    """
+    if isinstance( channels, dict ):
+        channels = list( channels.values() )
+    T9 = np.asarray( T9, dtype=float )
+    energy, quadrature = gauss_mesh( channels, order )
+
+    # Coulomb and Boltzmann factors, shape T9.shape + (nnodes,), shared by all the channels
+    weight = np.exp( -two_pi_eta( energy, reaction.eta_const ) - inv_k * energy / T9[...,None] )
+    weight *= quadrature
+    prefactor = rate_const / np.sqrt( reaction.mu ) * T9**-1.5
+
+    S = np.array( [ np.interp( energy, table[:,0], table[:,4] ) for table in channels ] )
+    rate = prefactor * np.moveaxis( weight @ S.T, -1, 0 )
+    if uncertainty is None:
+        return rate
+
+    if np.ndim( uncertainty ) == 0:
+        uncertainty = [ uncertainty ] * len( channels )
+    dS = np.array( [ np.interp( energy, table[:,0], table[:,4] * u ) for table, u in zip( channels, uncertainty ) ] )
+    band = prefactor * np.moveaxis( weight @ dS.T, -1, 0 )
+    return rate, np.maximum( rate - band, 0.0 ), rate + band
+
+
+def coverage( channels, T9=T9_grid, reaction=Reaction(), width=4.0 ):
+    """True where the Gamow window of a temperature ends inside all the tables."""
+    if isinstance( channels, dict ):
+        channels = list( channels.values() )
+    E0, delta = gamow_window( T9, reaction )
+    return E0 + width * delta <= min( table[-1,0] for table in channels )
+
+
+def write_table( filename, T9, rate, low=None, high=None, comment="" ):
+    """Write T9 and N_A<sigma v> (and the bands, if given) as columns."""
+    columns = [ T9, rate ] + [ c for c in ( low, high ) if c is not None ]
+    header = "T9  N_A<sigma v> [cm^3/mol/s]" + ( "  low  high" if len( columns ) == 4 else "" )
+    if comment:
+        header = comment + "\n" + header
+    np.savetxt( filename, np.column_stack( columns ), fmt="%.6e", header=header )
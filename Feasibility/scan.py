@@ -0,0 +1,178 @@
+"""Feasibility scans over beam energy, target, thickness, current and efficiency.
+
+    targets = { "CaF2": YieldEngine( stopping_CaF2, channels ),
+                "TaF6": YieldEngine( stopping_HF, channels ) }
+    result = scan( targets, np.linspace( 100, 400, 300 ), delta_e=[ 10, 20 ],
+                   current=[ 50e-6, 100e-6 ], efficiency=[ 0.3, 0.6 ] )
+    result["hours"].sel( channel="pa2", target="CaF2", delta_e=20, current=100e-6 )
+    result["hours"].sel( energy=250, method="nearest" )
+
+The yields of each target are computed once for all energies and
+thicknesses, and the current and efficiency enter by broadcasting, so a
+whole grid of what-if scenarios is a single call.  The results are
+``LabeledArray``s, numpy arrays with named dimensions and coordinates.
+"""
+
+import numpy as np
+
+from yields import q_c
+
+
+class LabeledArray:
+    """Array with named dimensions and a coordinate array per dimension."""
+
+    def __init__( self, data, dims, coords, name="", units="" ):
+        self.data = np.asarray( data )
+        self.dims = tuple( dims )
+        self.coords = { dim: np.asarray( coords[dim] ) for dim in self.dims }
+        self.name = name
+        self.units = units
+        if self.data.shape != tuple( len( self.coords[dim] ) for dim in self.dims ):
+            raise ValueError( f"shape {self.data.shape} does not match the coordinates of {self.dims}" )
+
+    @property
+    def shape( self ):
+        return self.data.shape
+
+    @property
+    def ndim( self ):
+        return self.data.ndim
+
+    def __array__( self, dtype=None, copy=None ):
+        return self.data if dtype is None else self.data.astype( dtype )
+
+    def __repr__( self ):
+        dims = ", ".join( f"{dim}: {len( self.coords[dim] )}" for dim in self.dims )
+        return f"<LabeledArray {self.name} [{self.units}] ({dims})>"
+
+    def _replace( self, data, dims, coords ):
+        return LabeledArray( data, dims, coords, self.name, self.units )
+
+    def index( self, dim, label, method=None ):
+        """Index of a label along a dimension.
+
+        Numeric labels must match a coordinate to within rounding
+        (``np.isclose``), unless ``method="nearest"`` picks the closest one.
+        """
+        coord = self.coords[dim]
+        if method not in ( None, "nearest" ):
+            raise ValueError( f"unknown method {method!r}" )
+        if coord.dtype.kind in "iuf":
+            if method == "nearest":
+                return int( np.argmin( np.abs( coord - label ) ) )
+            matches = np.flatnonzero( np.isclose( coord, label, rtol=1e-9, atol=0 ) )
+        else:
+            matches = np.flatnonzero( coord == label )
+        if len( matches ) == 0:
+            raise KeyError( f"{label!r} not in {dim}" )
+        return int( matches[0] )
+
+    def isel( self, **indices ):
+        """Select by position; an integer drops the dimension, a slice or
+        list keeps it."""
+        key, dims, coords = [], [], {}
+        for dim in self.dims:
+            i = indices.get( dim, slice( None ) )
+            key.append( i )
+            if not np.isscalar( i ):
+                dims.append( dim )
+                coords[dim] = self.coords[dim][i]
+        return self._replace( self.data[tuple( key )], dims, coords )
+
+    def sel( self, method=None, **labels ):
+        """Select by coordinate value, or a list of values; numbers must
+        match a coordinate unless ``method="nearest"`` (see ``index``)."""
+        indices = {}
+        for dim, label in labels.items():
+            if np.ndim( label ) == 0:
+                indices[dim] = self.index( dim, label, method )
+            else:
+                indices[dim] = [ self.index( dim, l, method ) for l in label ]
+        return self.isel( **indices )
+
+    def squeeze( self ):
+        """Drop the dimensions of length one."""
+        return self.isel( **{ dim: 0 for dim in self.dims if len( self.coords[dim] ) == 1 } )
+
+    def transpose( self, *dims ):
+        axes = [ self.dims.index( dim ) for dim in dims ]
+        return self._replace( self.data.transpose( axes ), dims, self.coords )
+
+    def reduce( self, func, dim ):
+        """Apply a numpy reduction (e.g. np.min) along a dimension."""
+        axis = self.dims.index( dim )
+        dims = [ d for d in self.dims if d != dim ]
+        return self._replace( func( self.data, axis=axis ), dims, self.coords )
+
+    def argmin( self, dim ):
+        """Coordinates of the minimum along a dimension."""
+        return self.coords[dim][np.argmin( self.data, axis=self.dims.index( dim ) )]
+
+    def to_rows( self ):
+        """One (coordinates..., value) tuple per element."""
+        grids = np.meshgrid( *( self.coords[dim] for dim in self.dims ), indexing="ij" )
+        return list( zip( *( g.ravel() for g in grids ), self.data.ravel() ) )
+
+    def to_csv( self, filename ):
+        """Write one line per element, the coordinates followed by the value."""
+        with open( filename, "w" ) as f:
+            f.write( ",".join( self.dims + ( f"{self.name} [{self.units}]", ) ) + "\n" )
+            for row in self.to_rows():
+                f.write( ",".join( str( x ) if isinstance( x, str ) else repr( float( x ) ) for x in row ) + "\n" )
+
+    def save( self, filename ):
+        np.savez( filename, data=self.data, dims=np.array( self.dims ), name=self.name, units=self.units,
+                  **{ "coord_" + dim: self.coords[dim] for dim in self.dims } )
+
+    @classmethod
+    def load( cls, filename ):
+        with np.load( filename ) as f:
+            dims = [ str( d ) for d in f["dims"] ]
+            return cls( f["data"], dims, { dim: f["coord_" + dim] for dim in dims },
+                        str( f["name"] ), str( f["units"] ) )
+
+
+def scan( targets, energy, delta_e=20.0, current=100e-6, efficiency=1.0, channels=None,
+          events=10000, event_rate=100.0, per=3600 ):
+    """Count rates, time to ``events`` events and current for ``event_rate``.
+
+    ``targets`` maps a target name to its ``YieldEngine``; ``channels``
+    picks channels by name (by default all those of the first target).
+    Every other argument may be a scalar or a list, and becomes a dimension
+    of the results.  Returns a dict of ``LabeledArray``:
+
+    - ``rate``: events per ``per`` seconds, dims (channel, target, energy,
+      delta_e, current, efficiency)
+    - ``hours``: hours to reach ``events`` events, same dims
+    - ``current``: beam current in A giving ``event_rate`` events per
+      second, dims (channel, target, energy, delta_e, efficiency)
+    - ``yield``: yield per beam particle, dims (channel, target, energy,
+      delta_e)
+    """
+    names = list( targets )
+    engines = list( targets.values() )
+    if channels is None:
+        channels = engines[0].names
+
+    energy = np.atleast_1d( np.asarray( energy, dtype=float ) )
+    delta_e = np.atleast_1d( np.asarray( delta_e, dtype=float ) )
+    current = np.atleast_1d( np.asarray( current, dtype=float ) )
+    efficiency = np.atleast_1d( np.asarray( efficiency, dtype=float ) )
+
+    # (channel, target, energy, delta_e), one engine call per target
+    Y = np.stack( [ engine( energy[:,None], delta_e[None,:] )[[ engine.index( c ) for c in channels ]]
+                    for engine in engines ], axis=1 )
+
+    detected = Y[...,None] * efficiency / q_c # events per coulomb
+    rate = detected[...,None,:] * current[:,None] * per
+    with np.errstate( divide="ignore" ):
+        hours = events / ( rate * 3600 / per )
+        required = event_rate / detected
+
+    coords = { "channel": np.array( channels ), "target": np.array( names ), "energy": energy,
+               "delta_e": delta_e, "current": current, "efficiency": efficiency }
+    dims = ( "channel", "target", "energy", "delta_e" )
+    return { "yield": LabeledArray( Y, dims, coords, "yield", "per particle" ),
+             "rate": LabeledArray( rate, dims + ( "current", "efficiency" ), coords, "rate", f"events/{per} s" ),
+             "hours": LabeledArray( hours, dims + ( "current", "efficiency" ), coords, "hours", "h" ),
+             "current": LabeledArray( required, dims + ( "efficiency", ), coords, "current", "A" ) }
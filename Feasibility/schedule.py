@@ -0,0 +1,130 @@
+"""Beam-time schedules from the feasibility count rates.
+
+A point at beam energy E_i measured for t_i hours at a rate of r_i events
+per hour reaches a relative statistical precision 1 / sqrt(r_i t_i).  Given
+a budget of hours, ``plan`` picks the points to measure and their hours:
+
+1. each point needs t_i = 1 / (p_i^2 r_i) hours (less what was already
+   collected) to reach the required precision p_i, and may not run longer
+   than the lifetime of a target, ``max_hours``;
+2. points are taken greedily by priority per hour, weight_i / (t_i +
+   overhead), while they fit in the budget, which for points of equal
+   weight maximizes the number measured;
+3. the hours left over go to the chosen points by water-filling, which
+   minimizes sum_i weight_i / (c_i + r_i t_i), the weighted sum of relative
+   variances with c_i the events already collected: the marginal gain
+   weight_i r_i / (c_i + r_i t_i)^2 is the same lambda at every point not
+   at a bound, so t_i = clip(sqrt(weight_i / (lambda r_i)) - c_i / r_i,
+   needed_i, max_i) with lambda found by bisection.
+
+Everything is array arithmetic, so a campaign can be re-planned in
+milliseconds as rates, budget or collected events change.
+"""
+
+import numpy as np
+from scipy.optimize import OptimizeResult
+
+from yields import q_c
+
+
+def hours_for_precision( rate, precision, collected=0.0 ):
+    """Hours to reach a relative precision at ``rate`` events per hour,
+    counting events already ``collected``."""
+    rate = np.asarray( rate, dtype=float )
+    events = np.maximum( 1 / np.asarray( precision, dtype=float )**2 - collected, 0.0 )
+    with np.errstate( divide="ignore", invalid="ignore" ):
+        return np.where( events > 0, events / rate, 0.0 )
+
+
+def lifetime_hours( max_charge, current ):
+    """Hours a target lasts at ``current`` (A) before it has taken
+    ``max_charge`` (C), e.g. the charge at which it has lost 10% of its 19F."""
+    return max_charge / np.asarray( current, dtype=float ) / 3600
+
+
+def _water_fill( budget, scale, lower, upper, shift=0.0, iterations=100 ):
+    # t = clip(level * scale - shift, lower, upper) with sum(t) = budget
+    if np.sum( upper ) <= budget:
+        return upper.copy()
+    lo, hi = 0.0, 1.0
+    while np.sum( np.clip( hi * scale - shift, lower, upper ) ) < budget:
+        hi *= 2
+    for _ in range( iterations ):
+        mid = 0.5 * ( lo + hi )
+        if np.sum( np.clip( mid * scale - shift, lower, upper ) ) < budget:
+            lo = mid
+        else:
+            hi = mid
+    return np.clip( hi * scale - shift, lower, upper )
+
+
+def plan( energy, rate, budget, precision=0.01, max_hours=np.inf, weight=1.0, overhead=0.0,
+          collected=0.0 ):
+    """Allocate ``budget`` hours of beam over the candidate energies.
+
+    ``rate`` is in events per hour at each energy, or one row per channel,
+    in which case the slowest channel sets the time of a point.
+    ``precision``, ``max_hours``, ``weight``, ``overhead`` (hours lost per
+    point measured, e.g. a target change) and ``collected`` (events per
+    point so far) are scalars or one value per energy.
+
+    Returns an OptimizeResult with the chosen ``energy`` and ``hours``, the
+    expected ``events`` and ``precision`` there, the ``selected`` mask over
+    the candidates, the hours ``used`` and the points ``infeasible`` within
+    ``max_hours``.
+    """
+    energy = np.asarray( energy, dtype=float )
+    rate = np.asarray( rate, dtype=float )
+    if rate.ndim > 1:
+        rate = rate.min( axis=0 )
+    n = len( energy )
+
+    precision = np.broadcast_to( np.asarray( precision, dtype=float ), n )
+    max_hours = np.broadcast_to( np.asarray( max_hours, dtype=float ), n )
+    weight = np.broadcast_to( np.asarray( weight, dtype=float ), n )
+    overhead = np.broadcast_to( np.asarray( overhead, dtype=float ), n )
+    collected = np.broadcast_to( np.asarray( collected, dtype=float ), n )
+
+    needed = hours_for_precision( rate, precision, collected )
+    feasible = ( rate > 0 ) & ( needed <= max_hours )
+
+    # greedy: best priority per hour first, as long as the points fit
+    cost = needed + overhead
+    with np.errstate( divide="ignore" ):
+        order = np.argsort( -np.where( feasible, weight / cost, -np.inf ), kind="stable" )
+    # a point that does not fit may leave room for cheaper ones after it
+    chosen = []
+    left = budget
+    for i in order[feasible[order]]:
+        if cost[i] <= left:
+            chosen.append( i )
+            left -= cost[i]
+    chosen = np.sort( np.array( chosen, dtype=int ) )
+
+    hours = np.zeros( n )
+    if len( chosen ):
+        spend = budget - np.sum( overhead[chosen] )
+        # level = 1 / sqrt(lambda), the events already collected shift the hours down
+        hours[chosen] = _water_fill( spend, np.sqrt( weight[chosen] / rate[chosen] ),
+                                     needed[chosen], max_hours[chosen], collected[chosen] / rate[chosen] )
+
+    selected = np.zeros( n, dtype=bool )
+    selected[chosen] = True
+    events = collected + rate * hours
+    with np.errstate( divide="ignore" ):
+        reached = np.where( events > 0, 1 / np.sqrt( events ), np.inf )
+
+    return OptimizeResult( energy=energy[selected], hours=hours[selected], events=events[selected],
+                           precision=reached[selected], selected=selected,
+                           used=float( np.sum( hours[selected] + overhead[selected] ) ),
+                           infeasible=energy[~feasible], allocation=hours )
+
+
+def charge( schedule, current ):
+    """Charge (C) delivered at each planned point for a beam ``current`` (A)."""
+    return schedule.hours * 3600 * np.asarray( current, dtype=float )
+
+
+def particles( schedule, current ):
+    """Beam particles at each planned point."""
+    return charge( schedule, current ) / q_c
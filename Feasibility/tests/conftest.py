@@ -0,0 +1,37 @@
+import glob
+import os
+import sys
+
+import pytest
+
+here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the modules import each other by name, as in the notebooks
+sys.path.insert(0, here)
+
+from SRIM import SRIM  # noqa: E402
+from datastore import loadtxt  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def feasibility():
+    """The Feasibility directory, holding the extrap/, stopping/ and data/ tables."""
+    return here
+
+
+@pytest.fixture(scope="module")
+def channels():
+    """The extrapolation tables by channel name, e.g. "19f_pa2"."""
+    return {os.path.basename(f)[:-7]: loadtxt(f) for f in sorted(glob.glob(os.path.join(here, "extrap", "*.extrap")))}
+
+
+@pytest.fixture(scope="module")
+def stopping_of():
+    """The stopping of H in a target of stopping/, e.g. stopping_of("H_in_F")."""
+    return lambda target: SRIM(os.path.join(here, "stopping", target + ".stop")).eval
+
+
+@pytest.fixture(scope="module")
+def stopping(stopping_of):
+    """The stopping of H in CaF2."""
+    return stopping_of("H_in_CaF2")
@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+
+from datastore import DataStore
+from SRIM import SRIM
+
+
+def load(feasibility, tmp_path, name='H_in_CaF2.stop'):
+    # a store in the temporary directory, parsed afresh by each test
+    return SRIM(os.path.join(feasibility, 'stopping', name), DataStore(str(tmp_path / 'store')))
+
+
+def test_evaluate_returns_writeable_copies(feasibility, tmp_path):
+    srim = load(feasibility, tmp_path)
+    energy = np.linspace(100., 1000., 10)
+    first = srim.eval(energy)
+    first *= 2
+    second = srim.eval(energy)
+    np.testing.assert_allclose(second, first / 2)
+    second[:] = 0
+    assert np.all(srim.eval(energy) > 0)
+
+
+def test_evaluate_scalar_matches_array(feasibility, tmp_path):
+    srim = load(feasibility, tmp_path)
+    energy = np.array([150., 450.])
+    values = srim.eval(energy, derivative=True)
+    assert [srim.eval(e, derivative=True) for e in energy] == list(values)
+    assert len(srim.cache) == 1
+
+
+def test_table_is_reparsed_on_version_change(feasibility, tmp_path, monkeypatch):
+    import datastore
+
+    srim = load(feasibility, tmp_path)
+    name = datastore.table_name(srim.filename)
+    assert srim.store.columns(name) == SRIM.columns
+    assert srim.store.units(name)['dedx'] == 'eV/(1e15 atoms/cm2)'
+    assert srim.density > 0
+
+    parsed = []
+    parse_table = SRIM.parse_table
+    monkeypatch.setattr(SRIM, 'parse_table', staticmethod(lambda name: parsed.append(name) or parse_table(name)))
+    load(feasibility, tmp_path)
+    assert parsed == []
+
+    monkeypatch.setattr(datastore, 'STORE_VERSION', datastore.STORE_VERSION + 1)
+    again = load(feasibility, tmp_path)
+    assert parsed == [os.path.abspath(srim.filename)]
+    np.testing.assert_array_equal(again.data, srim.data)
+    assert again.density == srim.density
@@ -0,0 +1,79 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import datastore
+from datastore import DataStore, loadtxt, table_name
+
+
+def counting(calls):
+    def parser(sources):
+        calls.append(sources)
+        return np.loadtxt(sources[0], ndmin=2), {"scale": 2.0}
+    return parser
+
+
+def test_loadtxt_matches_numpy(feasibility, tmp_path):
+    store = DataStore(str(tmp_path / "store"))
+    filename = os.path.join(feasibility, "data", "JUNA_pg1.dat")
+    np.testing.assert_array_equal(loadtxt(filename, store), np.loadtxt(filename))
+
+    name = table_name(filename)
+    assert name == "Feasibility/data/JUNA_pg1"
+    assert store.columns(name) == ["E_lab", "theta", "sigma", "dsigma"]
+    assert store.units(name)["sigma"] == "b"
+    with open(tmp_path / "store" / "manifest.json") as f:
+        entry = json.load(f)["tables"][name]
+    assert entry["stat"] == [[os.stat(filename).st_size, os.stat(filename).st_mtime_ns]]
+
+    # columns are read-only memory maps, the whole table a writeable copy
+    sigma = store.column(name, "sigma")
+    assert isinstance(sigma, np.memmap) and not sigma.flags.writeable
+    table = loadtxt(filename, store)
+    table[:, 0] *= 2
+    np.testing.assert_array_equal(loadtxt(filename, store), np.loadtxt(filename))
+
+
+def test_table_follows_the_source(tmp_path, monkeypatch):
+    filename = str(tmp_path / "table.dat")
+    with open(filename, "w") as f:
+        f.write("1 2\n3 4\n")
+
+    calls = []
+    store = DataStore(str(tmp_path / "store"))
+    name = store.add_file(filename, counting(calls), ["x", "y"], ["keV", "b"])
+    first = store.column(name, "y")
+    assert store.attrs(name)["scale"] == 2.0
+    assert len(calls) == 1
+
+    # another store over the same directory reads the manifest
+    again = DataStore(str(tmp_path / "store"))
+    again.add_file(filename, counting(calls), ["x", "y"], ["keV", "b"])
+    np.testing.assert_array_equal(again.load(name), [[1, 2], [3, 4]])
+    assert len(calls) == 1
+
+    with open(filename, "a") as f:
+        f.write("5 6\n")
+    assert store.load(name).shape == (3, 2)
+    assert len(calls) == 2
+    np.testing.assert_array_equal(first, [2, 4])
+
+    monkeypatch.setattr(datastore, "STORE_VERSION", datastore.STORE_VERSION + 1)
+    store = DataStore(str(tmp_path / "store"))
+    store.load(store.add_file(filename, counting(calls), ["x", "y"]))
+    assert len(calls) == 3
+
+    # another parser of the same file does not take its columns
+    store.add_file(filename, lambda sources: np.zeros(1), ["x"])
+    assert store.load(name).shape == (1, 1)
+
+
+def test_columns_must_match_the_table(tmp_path):
+    filename = str(tmp_path / "table.dat")
+    with open(filename, "w") as f:
+        f.write("1 2\n3 4\n")
+    store = DataStore(str(tmp_path / "store"))
+    with pytest.raises(ValueError):
+        store.load(store.add_file(filename, datastore._loadtxt, ["x"]))
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from degradation import DegradingTarget
+from yields import YieldEngine
+
+
+@pytest.fixture(scope="module")
+def parts(stopping_of, channels):
+    fluorine = stopping_of("H_in_F")
+    calcium = stopping_of("H_in_Ca")
+    return fluorine, lambda energy: 0.5 * calcium(energy), channels
+
+
+@pytest.fixture(scope="module")
+def target(parts):
+    fluorine, host, channels = parts
+    return DegradingTarget(fluorine, host, channels, [[0.0, 1.0], [100.0, 0.5]], emin=100.0, step=0.1)
+
+
+@pytest.mark.parametrize("fraction", [1.0, 0.6])
+def test_matches_an_engine_at_a_grid_fraction(parts, target, fraction):
+    fluorine, host, channels = parts
+    engine = YieldEngine(lambda energy: fraction * fluorine(energy) + host(energy), channels,
+                         emin=100.0, step=0.1)
+    energy = np.array([250.0, 480.0, 700.0])
+    thickness = target.thickness(energy, fraction)
+    np.testing.assert_allclose(target(energy, fraction), fraction * engine(energy, thickness), rtol=1e-10)
+
+
+def test_run_loses_counts(target):
+    result = target.run([400.0], [1e-4], hours=100.0, step=1.0)
+    fraction = result["fraction"].data[0]
+    assert fraction[-1] == pytest.approx(1 - 0.5 * 36.0 / 100.0)
+    rate = result["rate"].data[:, 0, 0]
+    assert np.all(np.diff(rate, axis=-1) < 0)
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from fitting import YieldModel, fit_poisson
+from yields import YieldEngine
+
+
+@pytest.fixture(scope="module")
+def model(stopping, channels):
+    engine = YieldEngine(stopping, channels, emin=100.0, emax=1000.0, step=0.5)
+    # resonances off the grid nodes, where the interpolated stopping has kinks
+    return YieldModel(engine, "19f_pa2", resonances=[(340.2, 0.02, 2.0), (480.3, 0.05, 1.0)],
+                      norm=1.1, delta_e=23.0, offset=1.3)
+
+
+def test_jacobian_matches_finite_differences(model):
+    energy = np.linspace(250.1, 610.3, 40)
+    params = model.initial.copy()
+    Y, jac = model.evaluate(params, energy)
+    np.testing.assert_allclose(Y, model(params, energy))
+
+    for k, name in enumerate(model.names):
+        h = 1e-6 * max(abs(params[k]), 1.0)
+        up, down = params.copy(), params.copy()
+        up[k] += h
+        down[k] -= h
+        fd = (model(up, energy) - model(down, energy)) / (2 * h)
+        scale = np.max(np.abs(fd))
+        np.testing.assert_allclose(jac[:, k], fd, rtol=1e-5, atol=1e-6 * scale, err_msg=name)
+
+
+def test_poisson_fit_with_scalar_particles(model):
+    energy = np.linspace(300.0, 600.0, 31)
+    truth = model.initial.copy()
+    particles = 1e15
+    counts = np.random.default_rng(1).poisson(model(truth, energy) * particles)
+    sol = fit_poisson(model, energy, counts, particles, fixed=("delta_e", "offset", "E_r0", "E_r1"))
+    assert sol.success
+    assert sol.parameters["norm"] == pytest.approx(truth[0], rel=5 * sol.errors["norm"] / truth[0])
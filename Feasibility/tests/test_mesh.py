@@ -0,0 +1,15 @@
+import numpy as np
+
+from mesh import AdaptiveYield
+from yields import YieldEngine
+
+
+def test_adaptive_yield_matches_fine_grid(stopping, channels):
+    fine = YieldEngine(stopping, channels, emin=100.0, emax=800.0, step=0.01)
+    adaptive = AdaptiveYield(stopping, channels, emin=100.0, emax=800.0, rtol=1e-4)
+    assert isinstance(adaptive, YieldEngine)
+    assert adaptive.names == fine.names
+    assert adaptive.evaluations < len(fine.grid) / 4
+
+    energy = np.linspace(200.0, 800.0, 61)
+    np.testing.assert_allclose(adaptive(energy, 30.0), fine(energy, 30.0), rtol=2e-3)
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from montecarlo import MonteCarlo
+from yields import YieldEngine
+
+
+@pytest.fixture(scope="module")
+def engine(stopping, channels):
+    return YieldEngine(stopping, channels, emin=100.0, emax=1000.0, step=0.1)
+
+
+class Constant:
+    # stands in for the generator: every standard normal is the same value
+    def __init__(self, value):
+        self.value = value
+
+    def standard_normal(self, size):
+        return np.full(size, self.value)
+
+
+def test_contributions_sum_to_the_yield(engine):
+    mc = MonteCarlo(engine)
+    energy = np.array([250.0, 480.0])
+    np.testing.assert_allclose(mc.contributions(energy, 20.0).sum(axis=-1), engine(energy, 20.0), rtol=1e-12)
+
+
+@pytest.mark.parametrize("z", [1.0, 0.75, -2.3])
+def test_stopping_scales_the_thickness(engine, z):
+    mc = MonteCarlo(engine, stopping_uncertainty=0.1)
+    mc.rng = Constant(z)
+    energy = np.array([250.0, 480.0, 700.0])
+    Y, _ = mc.sample_yields(energy, 20.0, nsamples=3)
+    s = 1.1**z
+    np.testing.assert_allclose(Y, np.broadcast_to(engine(energy, 20.0 * s) / s, Y.shape), rtol=1e-9)
+
+
+def test_zero_rate_samples_are_reported(engine):
+    mc = MonteCarlo(engine, s_uncertainty=0.1, stopping_uncertainty=0.05, seed=2)
+    bands = mc.propagate([50.0, 400.0], 20.0, 100e-6, 0.5, nsamples=200)
+    zero = bands["zero_rate"].data
+    np.testing.assert_array_equal(zero, [[1.0, 0.0]] * len(engine.names))
+    hours = bands["hours"].data
+    assert np.isnan(hours[:, :, 0]).all()
+    assert np.isfinite(hours[:, :, 1]).all()
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from scipy.integrate import quad
+
+from kinematics import Reaction, two_pi_eta
+from rates import inv_k, rate_const, reaction_rate
+
+reaction = Reaction()
+
+
+def quad_rate(table, T9):
+    # adaptive quadrature of the interpolated S-factor, one table interval at a time
+    def integrand(E):
+        return np.interp(E, table[:, 0], table[:, 4]) * np.exp(-two_pi_eta(E, reaction.eta_const) - inv_k * E / T9)
+    edges = np.concatenate(([0.0], table[:, 0]))
+    value = sum(quad(integrand, a, b, epsabs=0, epsrel=1e-12)[0] for a, b in zip(edges[:-1], edges[1:]))
+    return rate_const / np.sqrt(reaction.mu) * T9**-1.5 * value
+
+
+@pytest.mark.parametrize("name", ["19f_pa2", "19f_pa4"])
+def test_rate_matches_quad(channels, name):
+    table = channels[name]
+    T9 = np.array([0.03, 0.3, 3.0])
+    rate = reaction_rate([table], T9)[0]
+    np.testing.assert_allclose(rate, [quad_rate(table, T) for T in T9], rtol=1e-8)
+
+
+def test_narrow_resonance_matches_quad():
+    # a 2 keV wide resonance far above the Gamow window of the low temperatures
+    E = np.linspace(0.01, 1.0, 1981)
+    S = 1e-3 * (1 + 1e6 * 1e-6 / ((E - 0.4)**2 + 1e-6))
+    table = np.column_stack((E, np.zeros_like(E), np.zeros_like(E), np.zeros_like(E), S))
+    T9 = np.array([0.05, 0.2, 1.0])
+    rate = reaction_rate([table], T9)[0]
+    np.testing.assert_allclose(rate, [quad_rate(table, T) for T in T9], rtol=1e-8)
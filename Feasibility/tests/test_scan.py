@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from scan import LabeledArray
+
+
+@pytest.fixture
+def array():
+    coords = {"channel": np.array(["pa0", "pa2"]), "energy": np.linspace(100.0, 400.0, 301)}
+    return LabeledArray(np.arange(602.0).reshape(2, 301), ("channel", "energy"), coords, "rate", "1/h")
+
+
+def test_sel_exact(array):
+    assert float(array.sel(channel="pa2", energy=250.0).data) == 301 + 150
+    # within rounding of a coordinate
+    assert float(array.sel(channel="pa0", energy=0.1 * 2500).data) == 150
+    np.testing.assert_array_equal(array.sel(energy=[100.0, 400.0]).data, [[0, 300], [301, 601]])
+
+
+def test_sel_missing_label(array):
+    with pytest.raises(KeyError):
+        array.sel(energy=250.4)
+    with pytest.raises(KeyError):
+        array.sel(channel="pa1")
+
+
+def test_sel_nearest(array):
+    assert float(array.sel(channel="pa0", energy=250.4, method="nearest").data) == 150
+    with pytest.raises(ValueError):
+        array.sel(energy=250.0, method="linear")
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from schedule import plan
+
+
+def test_marginal_gain_is_equal_with_collected_events():
+    energy = np.linspace(200.0, 400.0, 6)
+    rate = np.array([50.0, 80.0, 120.0, 200.0, 300.0, 500.0])
+    weight = np.array([1.0, 2.0, 1.0, 3.0, 1.0, 2.0])
+    collected = np.array([0.0, 5000.0, 20000.0, 1000.0, 40000.0, 0.0])
+    schedule = plan(energy, rate, budget=2000.0, precision=0.02, weight=weight, collected=collected)
+
+    assert schedule.used == pytest.approx(2000.0)
+    h = schedule.allocation
+    chosen = schedule.selected
+    assert chosen.all()
+    # the gain of one more hour, -d/dt weight / (collected + rate t)
+    gain = weight * rate / (collected + rate * h)**2
+    np.testing.assert_allclose(gain[chosen], gain[chosen][0], rtol=1e-8)
+
+
+def test_bounds_are_kept():
+    rate = np.array([100.0, 100.0])
+    schedule = plan([1.0, 2.0], rate, budget=500.0, precision=0.05, max_hours=[1000.0, 100.0],
+                    collected=[0.0, 100.0])
+    np.testing.assert_allclose(schedule.allocation, [400.0, 100.0])
@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+
+from yields import YieldEngine
+
+
+def test_non_uniform_grid_matches_uniform(stopping, channels):
+    uniform = YieldEngine(stopping, channels, emin=100.0, emax=500.0, step=0.5)
+    # the same nodes, shuffled in by a search instead of a division
+    grid = np.concatenate((uniform.grid, [123.25]))
+    other = YieldEngine(stopping, channels, grid=grid)
+    assert uniform.step == pytest.approx(0.5) and other.step is None
+
+    energy = np.array([150.0, 150.25, 300.0, 499.0])
+    np.testing.assert_allclose(other(energy, 20.0), uniform(energy, 20.0), rtol=1e-3)
+    np.testing.assert_array_equal(other(energy, 0.0), 0.0)
+    with pytest.raises(ValueError, match="uniform"):
+        other.smear([1.0])
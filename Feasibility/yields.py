@@ -0,0 +1,210 @@
+"""Thick-target yields from cumulative integrals of sigma / epsilon.
+
+The yield of a target of energy thickness delta_e at beam energy E is
+
+    Y(E, delta_e) = int_{E - delta_e}^{E} sigma(E') / epsilon(E') dE'
+
+so once the cumulative integral C(E) of sigma / epsilon is tabulated on a
+fine lab energy grid, Y = C(E) - C(E - delta_e) for any number of beam
+energies, and all the channels of a target are evaluated together.  The
+grid is uniform by default, where an energy is bracketed by a division; any
+other grid, e.g. one refined around the resonances by ``mesh.refine``, is
+bracketed by a binary search.
+"""
+
+import numpy as np
+
+import kinematics
+from kinematics import M0, M1
+
+barn_to_cm2 = 1e-24
+q_c = 1.60217662e-19 # C
+
+
+def lab_to_cm( energy_lab, M0=M0, M1=M1 ):
+    return kinematics.lab_to_cm( energy_lab, M0, M1 )
+
+
+def cm_to_lab( energy_cm, M0=M0, M1=M1 ):
+    return kinematics.cm_to_lab( energy_cm, M0, M1 )
+
+
+class YieldEngine:
+    """Cumulative yield tables of one target for several channels.
+
+    ``stopping`` is the effective stopping power in eV / (1e15 atoms/cm2)
+    as a function of the lab energy in keV, either a callable (e.g.
+    ``SRIM.eval`` or a ``CompoundStopping``) or a two column (energy,
+    stopping) array.  ``channels`` maps a name to an extrapolation table
+    with the center-of-mass energy in MeV in the first column and the cross
+    section in barn in the fourth; a plain list of tables is named by
+    ``names`` or by position.  The tables are built on ``grid`` (keV) if
+    given, else on a uniform grid from ``emin`` to ``emax`` by ``step``.
+    """
+
+    def __init__( self, stopping, channels=(), names=None, emin=0.0, emax=1000.0, step=0.05,
+                  M0=M0, M1=M1, grid=None ):
+        self.M0 = M0
+        self.M1 = M1
+
+        if grid is None:
+            grid = np.linspace( emin, emax, int( round( ( emax - emin ) / step ) ) + 1 )
+        self.grid = np.unique( np.asarray( grid, dtype=float ) )
+        npoints = len( self.grid )
+
+        # the step of a uniform grid, None otherwise
+        h = np.diff( self.grid )
+        self.step = h[0] if np.allclose( h, h[0], rtol=1e-9, atol=0 ) else None
+
+        # stopping and kinematics are evaluated once per node and shared by
+        # all the channels, present and future
+        if callable( stopping ):
+            stop = np.asarray( stopping( self.grid ), dtype=float )
+        else:
+            stop = np.interp( self.grid, stopping[:,0], stopping[:,1] )
+        self.weight = barn_to_cm2 / stop * 1e15 * 1e3 # 1e15 atoms/cm^2, 1e3 eV
+        self.energy_cm = lab_to_cm( self.grid, M0, M1 ) / 1e3
+
+        self.names = []
+        self.cross = np.zeros( ( 0, npoints ) )
+        self.cumulative = np.zeros( ( 0, npoints ) )
+
+        if isinstance( channels, dict ):
+            items = channels.items()
+        else:
+            items = zip( names if names is not None else map( str, range( len( channels ) ) ), channels )
+        self.add_channels( items )
+
+    def add_channels( self, items ):
+        """Add (name, table) pairs, integrating all their rows together."""
+        items = list( items )
+        if not items:
+            return
+
+        cross = np.array( [ np.interp( self.energy_cm, table[:,0], table[:,3] ) for _, table in items ] )
+        integrand = cross * self.weight
+
+        # trapezoidal cumulative integral, starting from 0 at emin
+        cumulative = np.zeros_like( integrand )
+        np.cumsum( 0.5 * np.diff( self.grid ) * ( integrand[:,1:] + integrand[:,:-1] ), axis=1,
+                   out=cumulative[:,1:] )
+
+        self.names += [ name for name, _ in items ]
+        self.cross = np.vstack( ( self.cross, cross ) )
+        self.cumulative = np.vstack( ( self.cumulative, cumulative ) )
+
+    def add_channel( self, name, table ):
+        """Add one channel; only its own cross section is interpolated and summed."""
+        self.add_channels( [ ( name, table ) ] )
+
+    def index( self, name ):
+        return self.names.index( name )
+
+    def _bracket( self, energy ):
+        # node below each energy and the fraction of the way to the next one,
+        # by a division on a uniform grid and a binary search otherwise
+        last = len( self.grid ) - 1
+        if self.step is not None:
+            x = np.clip( ( energy - self.grid[0] ) / self.step, 0, last )
+            i = np.minimum( x.astype( int ), last - 1 )
+            return i, x - i
+        energy = np.clip( energy, self.grid[0], self.grid[-1] )
+        i = np.clip( np.searchsorted( self.grid, energy, side="right" ) - 1, 0, last - 1 )
+        return i, ( energy - self.grid[i] ) / ( self.grid[i + 1] - self.grid[i] )
+
+    def _cumulative( self, energy ):
+        # linear in the cumulative table, for all channels at once
+        i, f = self._bracket( energy )
+        return self.cumulative[:,i] * ( 1 - f ) + self.cumulative[:,i + 1] * f
+
+    def yield_between( self, low, high ):
+        """Yield of every channel of the beam slowing down from ``high`` to
+        ``low`` (keV), shape (nchannels,) + the broadcast shape of both;
+        energies beyond the grid are taken at its ends."""
+        low, high = np.broadcast_arrays( np.asarray( low, dtype=float ), np.asarray( high, dtype=float ) )
+        return self._cumulative( high ) - self._cumulative( low )
+
+    def __call__( self, energy, delta_e ):
+        """Yield of every channel, shape (nchannels,) + energy.shape."""
+        energy = np.asarray( energy, dtype=float )
+        return self.yield_between( energy - delta_e, energy )
+
+    def count_rates( self, energy, delta_e, current, efficiency, per=3600 ):
+        """Detected events per ``per`` seconds (default per hour) of every
+        channel, for a beam current in A and a detection efficiency that is
+        a scalar or one value per channel."""
+        efficiency = np.asarray( efficiency, dtype=float )
+        if efficiency.ndim == 1:
+            efficiency = efficiency[:,None]
+        return self( energy, delta_e ) * current / q_c * efficiency * per
+
+    def channel( self, name, energy, delta_e ):
+        """Yield of a single channel."""
+        energy = np.asarray( energy, dtype=float )
+        c = self.cumulative[self.index( name )]
+        return np.interp( energy, self.grid, c ) - np.interp( energy - delta_e, self.grid, c )
+
+    def smear( self, widths ):
+        """Cross sections of every channel convolved with Gaussians of the
+        given standard deviations (keV), shape (nchannels, nwidths, ngrid).
+
+        The convolution is done with one FFT per channel on the uniform
+        grid, padded with the edge values so nothing wraps around.
+        """
+        if self.step is None:
+            raise ValueError( "smearing needs a uniform grid" )
+        pad = int( np.ceil( 8 * max( np.max( widths ), self.step ) / self.step ) )
+        padded = np.pad( self.cross, ( ( 0, 0 ), ( pad, pad ) ), mode="edge" )
+
+        spectrum = np.fft.rfft( padded, axis=1 )
+        frequency = np.fft.rfftfreq( padded.shape[1], d=self.step )
+        transfer = np.exp( -0.5 * ( 2 * np.pi * frequency[None,:] * np.asarray( widths )[:,None] )**2 )
+
+        smeared = np.fft.irfft( spectrum[:,None,:] * transfer[None,:,:], n=padded.shape[1], axis=2 )
+        return smeared[:,:,pad:pad + len( self.grid )]
+
+    def spread_yield( self, energy, delta_e, beam_spread=0.0, straggling=None, nwidths=32 ):
+        """Yield of every channel for a Gaussian beam of standard deviation
+        ``beam_spread`` (keV) that also straggles in the target.
+
+        ``straggling`` is the SRIM table of the target material: at the
+        depth where the mean energy has dropped from E0 to E the energy
+        spread is (dE/dR)(E) * sqrt(sigma_R(E0)^2 - sigma_R(E)^2), from the
+        projected range R and the longitudinal straggling sigma_R, added in
+        quadrature to the beam spread.  The cross sections are smeared once
+        on ``nwidths`` widths and interpolated between them, so a full
+        excitation function costs a few FFTs and array lookups.
+        """
+        if self.step is None:
+            raise ValueError( "smearing needs a uniform grid" )
+        energy = np.atleast_1d( np.asarray( energy, dtype=float ) )
+
+        # mean energies across the target, on a grid as fine as the table
+        nsteps = max( int( np.ceil( delta_e / self.step ) ), 1 )
+        depth = energy[:,None] - delta_e * ( 1 - np.linspace( 0, 1, nsteps + 1 ) )[None,:]
+
+        width2 = np.full( depth.shape, beam_spread**2 )
+        if straggling is not None:
+            sigma_r0 = straggling.eval_longitudinal_straggle( energy )[:,None]
+            sigma_r = straggling.eval_longitudinal_straggle( depth.ravel() ).reshape( depth.shape )
+            dedr = 1 / straggling.eval_range( depth.ravel(), derivative=True ).reshape( depth.shape )
+            width2 += dedr**2 * np.maximum( sigma_r0**2 - sigma_r**2, 0 )
+        width = np.sqrt( width2 )
+
+        # widths 0, then log-spaced up to the largest one needed
+        widths = np.concatenate( ( [ 0.0 ], np.geomspace( self.step / 4, max( width.max(), self.step ), nwidths - 1 ) ) )
+        smeared = self.smear( widths )
+
+        # bilinear interpolation in energy node and width
+        x = np.clip( ( depth - self.grid[0] ) / self.step, 0, len( self.grid ) - 1 )
+        i = np.minimum( x.astype( int ), len( self.grid ) - 2 )
+        f = x - i
+        k = np.clip( np.searchsorted( widths, width ) - 1, 0, nwidths - 2 )
+        g = np.clip( ( width - widths[k] ) / ( widths[k + 1] - widths[k] ), 0, 1 )
+
+        cross = ( ( smeared[:,k,i] * ( 1 - f ) + smeared[:,k,i + 1] * f ) * ( 1 - g )
+                  + ( smeared[:,k + 1,i] * ( 1 - f ) + smeared[:,k + 1,i + 1] * f ) * g )
+        integrand = cross * np.interp( depth, self.grid, self.weight )
+
+        h = delta_e / nsteps
+        return h * ( integrand.sum( axis=2 ) - 0.5 * ( integrand[:,:,0] + integrand[:,:,-1] ) )